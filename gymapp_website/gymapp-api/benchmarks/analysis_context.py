@@ -0,0 +1,70 @@
+"""
+Benchmark analysis prompt size against history length: the old 100-workout dump vs build_workout_context
+
+Usage: python benchmarks/analysis_context.py [budget]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.workout_context import build_workout_context, estimate_tokens, format_workout
+
+MUSCLES = ["Chest", "Back", "Quads", "Hamstrings", "Glutes", "Shoulders", "Biceps", "Triceps", "Core", "Calves"]
+HISTORY_LENGTHS = (10, 50, 100, 250, 500, 1000)
+
+
+def make_workouts(count: int):
+    """Build hydrated workouts shaped like get_recent_with_details: ~6 exercises of 3-4 sets, every other day"""
+    exercises = [
+        {'name': f"Exercise {i}", 'muscles': random.sample(MUSCLES, 2)}
+        for i in range(60)
+    ]
+    start = datetime(2020, 1, 1, 17, 0)
+    workouts = []
+    for i in range(count):
+        workouts.append({
+            'name': f"Workout {i}",
+            'date': start + timedelta(days=2 * i),
+            'duration': 70,
+            'notes': "Felt strong",
+            'detailed_exercises': [
+                {
+                    **exercise,
+                    'sets': [
+                        {'weight': str(random.randint(20, 300)), 'reps': str(random.randint(3, 15))}
+                        for _ in range(random.randint(3, 4))
+                    ]
+                }
+                for exercise in random.sample(exercises, 6)
+            ],
+        })
+    return workouts
+
+
+def format_all(workouts, limit: int = 100):
+    """The previous prompt format: every set of the latest 100 workouts"""
+    latest = sorted(workouts, key=lambda workout: workout['date'], reverse=True)[:limit]
+    return "\n---\n".join(format_workout(workout) for workout in latest)
+
+
+def main():
+    budget = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    random.seed(0)
+    print(f"Token budget {budget}")
+    print(f"{'workouts':>8} {'old tokens':>11} {'new tokens':>11} {'new chars':>10} {'build ms':>9}")
+    for count in HISTORY_LENGTHS:
+        workouts = make_workouts(count)
+        old = format_all(workouts)
+        started = time.perf_counter()
+        new = build_workout_context(workouts, token_budget=budget)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{count:>8} {estimate_tokens(old):>11} {estimate_tokens(new):>11} {len(new):>10} {elapsed:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark JSON encoding of a workout list: FastAPI's default path vs FastJSONResponse
+
+Usage: python benchmarks/json_encoding.py [workouts] [repeats]
+"""
+
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+
+from models.workouts import WorkoutsDB
+from utils import responses
+
+
+def make_workouts(count: int):
+    """Build workouts shaped like the reference data: ~6 exercises of 3-4 string sets"""
+    user_id = uuid4()
+    exercise_ids = [uuid4() for _ in range(150)]
+    start = datetime(2020, 1, 1, 17, 0)
+    workouts = []
+    for i in range(count):
+        exercises = random.sample(exercise_ids, 6)
+        workouts.append(WorkoutsDB(
+            name=f"Workout {i}",
+            date=start + timedelta(days=i),
+            start_time=start + timedelta(days=i),
+            end_time=start + timedelta(days=i, minutes=70),
+            duration=70,
+            notes="Felt strong",
+            exercises=exercises,
+            exercise_performances=[
+                {
+                    'exercise_id': str(exercise_id),
+                    'sets': [
+                        {'weight': str(random.randint(20, 300)), 'reps': str(random.randint(3, 15))}
+                        for _ in range(random.randint(3, 4))
+                    ]
+                }
+                for exercise_id in exercises
+            ],
+            user_id=user_id
+        ))
+    return workouts
+
+
+def encode_default(workouts):
+    """What FastAPI does for a returned dict: jsonable_encoder, then stdlib json"""
+    return json.dumps(
+        jsonable_encoder({"workouts": workouts}),
+        ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_fast(workouts):
+    """What FastJSONResponse does: encode the models directly"""
+    return responses.dumps({"workouts": workouts})
+
+
+def measure(label, encode, workouts, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        body = encode(workouts)
+        best = min(best, time.perf_counter() - started)
+    per_thousand = best * 1000 / len(workouts) * 1000
+    print(f"{label:<28} {per_thousand:8.1f} ms / 1,000 workouts   {len(body) / 1024:8.0f} KiB")
+    return body
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    random.seed(0)
+    workouts = make_workouts(count)
+    print(f"Encoding {count} workouts, best of {repeats} (orjson {'installed' if responses.orjson else 'missing'})")
+
+    measure("jsonable_encoder + json", encode_default, workouts, repeats)
+    body = measure("FastJSONResponse", encode_fast, workouts, repeats)
+
+    started = time.perf_counter()
+    compressed = gzip.compress(body, compresslevel=responses.GZIP_LEVEL)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{'gzip level ' + str(responses.GZIP_LEVEL):<28} {elapsed / count * 1000:8.1f} ms / 1,000 workouts   {len(compressed) / 1024:8.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark peak memory of the workouts JSON export on a synthetic million-set dataset:
+the old load-everything dump vs the streaming write_snapshot
+
+Each export runs in its own process so peak RSS is measured independently. Exits non-zero
+when the streaming export goes over the RSS ceiling.
+
+Usage: python benchmarks/json_export.py [--sets 1000000] [--max-rss-mb 256] [--url sqlite:///...]
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from models.users import UsersDB
+from models.workouts import WorkoutsDB
+from migrations.delta_export import datetime_serializer, write_snapshot
+from migrations.workouts_sync import workout_to_dict
+
+EXERCISES_PER_WORKOUT = 6
+SETS_PER_EXERCISE = 4
+INSERT_BATCH_SIZE = 1000
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_dataset(url: str, total_sets: int):
+    """Insert one user and enough workouts of 6 exercises x 4 sets to reach total_sets"""
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine, tables=[UsersDB.__table__, WorkoutsDB.__table__])
+    user_id = uuid4()
+    exercise_ids = [str(uuid4()) for _ in range(60)]
+    start = datetime(2015, 1, 1, 17, 0)
+    workout_count = total_sets // (EXERCISES_PER_WORKOUT * SETS_PER_EXERCISE)
+
+    with Session(engine) as session:
+        session.add(UsersDB(
+            item_id=user_id, username=f"bench-{user_id}", first_name="Bench", last_name="User",
+            age=30, height=180, weight=180, sex="M", experience=3, last_use=start, goal=[],
+            hashed_password="x"
+        ))
+        session.commit()
+
+        rows = []
+        for i in range(workout_count):
+            exercises = random.sample(exercise_ids, EXERCISES_PER_WORKOUT)
+            date = start + timedelta(hours=8 * i)
+            rows.append({
+                'item_id': uuid4(),
+                'item_created': date,
+                'item_modified': date,
+                'name': f"Workout {i}",
+                'date': date,
+                'duration': 60,
+                'notes': "Synthetic benchmark workout",
+                'exercises': exercises,
+                'exercise_performances': [
+                    {
+                        'exercise_id': exercise_id,
+                        'sets': [
+                            {'weight': str(random.randint(20, 300)), 'reps': str(random.randint(3, 15))}
+                            for _ in range(SETS_PER_EXERCISE)
+                        ]
+                    }
+                    for exercise_id in exercises
+                ],
+                'user_id': user_id,
+            })
+            if len(rows) == INSERT_BATCH_SIZE:
+                session.execute(WorkoutsDB.__table__.insert(), rows)
+                rows = []
+        if rows:
+            session.execute(WorkoutsDB.__table__.insert(), rows)
+        session.commit()
+
+    return workout_count
+
+
+def export(url: str, mode: str, filepath: str):
+    """Run one export in this process and print its stats as JSON"""
+    engine = create_engine(url)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    with Session(engine) as session:
+        if mode == "stream":
+            count = write_snapshot(session, WorkoutsDB, workout_to_dict, filepath)
+        else:
+            workouts = session.exec(select(WorkoutsDB)).all()
+            workouts_data = [workout_to_dict(workout) for workout in workouts]
+            with open(filepath, 'w') as f:
+                json.dump(workouts_data, f, indent=2, default=datetime_serializer)
+            count = len(workouts_data)
+    print(json.dumps({
+        'mode': mode,
+        'rows': count,
+        'seconds': time.perf_counter() - started,
+        'baseline_mb': baseline,
+        'peak_mb': peak_rss_mb(),
+        'file_mb': os.path.getsize(filepath) / 1024 / 1024,
+    }))
+
+
+def run_export(url: str, mode: str, filepath: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--export", mode, "--url", url, "--out", filepath],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sets", type=int, default=1_000_000)
+    parser.add_argument("--max-rss-mb", type=float, default=256)
+    parser.add_argument("--url", default=None, help="database to use (default: a temporary SQLite file)")
+    parser.add_argument("--skip-list", action="store_true", help="only run the streaming export")
+    parser.add_argument("--export", choices=["stream", "list"], help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.export:
+        export(args.url, args.export, args.out)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="json-export-bench-")
+    url = args.url or f"sqlite:///{os.path.join(workdir, 'bench.sqlite')}"
+    random.seed(0)
+
+    started = time.perf_counter()
+    workouts = make_dataset(url, args.sets)
+    print(f"Inserted {workouts} workouts ({args.sets} sets) in {time.perf_counter() - started:.1f}s")
+
+    modes = ["stream"] if args.skip_list else ["stream", "list"]
+    results = {mode: run_export(url, mode, os.path.join(workdir, f"workouts-{mode}.json")) for mode in modes}
+
+    print(f"{'mode':>6} {'rows':>8} {'seconds':>8} {'base MB':>8} {'peak MB':>8} {'file MB':>8}")
+    for result in results.values():
+        print(
+            f"{result['mode']:>6} {result['rows']:>8} {result['seconds']:>8.1f} {result['baseline_mb']:>8.0f} "
+            f"{result['peak_mb']:>8.0f} {result['file_mb']:>8.0f}"
+        )
+
+    peak = results["stream"]["peak_mb"]
+    if peak > args.max_rss_mb:
+        print(f"FAIL: streaming export peaked at {peak:.0f}MB, over the {args.max_rss_mb:.0f}MB ceiling")
+        sys.exit(1)
+    print(f"OK: streaming export stayed under {args.max_rss_mb:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,28 @@
 import time
+import asyncio
 import atexit
-from uuid import uuid4
+from uuid import uuid4, UUID
+from typing import Optional
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 
-from fastapi import FastAPI, Request, status, Depends
+from fastapi import FastAPI, HTTPException, Request, status, Depends
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from routers import users, exercises, workouts, planned_workouts, analysis
-from utils.db import init_db, get_session, engine
+from utils.db import init_db, get_session, get_async_session, get_pool_stats, engine, async_engine
 from migrations.json_sync import import_all_data, export_all_data
 from models.users import UsersDB
+from utils.auth import shutdown_hash_pool
+from utils.activity import activity_buffer, flush_periodically
+from models import weekly_rollups as weekly_rollups_models
+from models import personal_records as personal_records_models
 
 
 load_dotenv()
@@ -31,12 +39,18 @@ async def lifespan(app: FastAPI):
     with Session(engine) as session:
         import_all_data(session)
     
+    activity_flusher = asyncio.create_task(flush_periodically())
+    
     yield
     
     print("Shutting down...")
     
+    activity_flusher.cancel()
+    activity_buffer.flush()
     with Session(engine) as session:
         export_all_data(session)
+    await async_engine.dispose()
+    shutdown_hash_pool()
 
 
 app = FastAPI(
@@ -49,12 +63,22 @@ app = FastAPI(
 def cleanup():
     """Cleanup function for unexpected shutdowns"""
     try:
+        activity_buffer.flush()
         with Session(engine) as session:
             export_all_data(session)
     except Exception as e:
         print(f"Error during cleanup: {e}")
 
-atexit.register(cleanup)
+# The bcrypt pool's spawned workers re-import this module as __mp_main__ when the app
+# runs via `python main.py`; only the server process may flush and export on exit
+if __name__ != "__mp_main__":
+    atexit.register(cleanup)
+
+
+def run_with_session(task):
+    """Run a sync JSON import/export task with its own session (called from the threadpool)"""
+    with Session(engine) as session:
+        task(session)
 
 app.add_middleware(
     CORSMiddleware,
@@ -106,11 +130,11 @@ async def generic_exception_handler(request: Request, exc: Exception):
 
 
 @app.get("/health", tags=["Health"])
-async def health_check(session: Session = Depends(get_session)):
+async def health_check(session: AsyncSession = Depends(get_async_session)):
     """Health check endpoint"""
     try:
         statement = select(UsersDB).limit(1)
-        session.exec(statement)
+        await session.exec(statement)
         db_status = "connected"
     except Exception as e:
         db_status = f"error: {str(e)}"
@@ -123,25 +147,57 @@ async def health_check(session: Session = Depends(get_session)):
 
 
 @app.post("/admin/import", tags=["Admin"])
-async def manual_import(session: Session = Depends(get_session)):
+async def manual_import():
     """Manually trigger data import from JSON"""
     try:
-        import_all_data(session)
+        await run_in_threadpool(run_with_session, import_all_data)
         return {"status": "success", "message": "Data imported successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/admin/export", tags=["Admin"])
-async def manual_export(session: Session = Depends(get_session)):
-    """Manually trigger data export to JSON"""
+async def manual_export(full: bool = False):
+    """Manually trigger data export to JSON; full=true compacts every table into a fresh snapshot"""
     try:
-        export_all_data(session)
+        await run_in_threadpool(run_with_session, lambda session: export_all_data(session, full=full))
         return {"status": "success", "message": "Data exported successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/admin/pool", tags=["Admin"])
+async def pool_stats():
+    """Live connection pool occupancy, checkout wait and connect latency for this worker"""
+    return get_pool_stats()
+
+
+@app.get("/admin/activity", tags=["Admin"])
+async def activity_stats():
+    """Pending and flushed write-behind last-seen updates for this worker"""
+    return activity_buffer.stats()
+
+
+@app.post("/admin/rollups/rebuild", tags=["Admin"])
+def rebuild_rollups(user_id: Optional[UUID] = None, session: Session = Depends(get_session)):
+    """Rebuild weekly training rollups from the stored sets"""
+    try:
+        rebuilt = weekly_rollups_models.rebuild(session, user_id)
+        return {"status": "success", "message": f"Rebuilt {rebuilt} weekly rollups"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/admin/records/rebuild", tags=["Admin"])
+def rebuild_records(user_id: Optional[UUID] = None, session: Session = Depends(get_session)):
+    """Rebuild personal records from the stored sets"""
+    try:
+        rebuilt = personal_records_models.rebuild(session, user_id)
+        return {"status": "success", "message": f"Rebuilt {rebuilt} personal records"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=7778)
\ No newline at end of file
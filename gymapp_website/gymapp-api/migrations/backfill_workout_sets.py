@@ -0,0 +1,47 @@
+"""
+Migration script to backfill the workout_sets table from workout exercise_performances
+"""
+
+import os
+import sys
+from sqlmodel import Session, select
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import workouts as workouts_models
+from models import workout_sets as workout_sets_models
+from models import weekly_rollups as weekly_rollups_models
+from models import personal_records as personal_records_models
+from utils.db import engine, init_db
+
+
+def backfill_workout_sets(session: Session) -> int:
+    """Create set rows (and their rollups and records) for every workout that has none yet"""
+    has_sets = select(workout_sets_models.WorkoutSetsDB.workout_id).distinct()
+    workouts = session.exec(
+        select(workouts_models.WorkoutsDB).where(workouts_models.WorkoutsDB.item_id.not_in(has_sets))
+    ).all()
+    
+    created_count = 0
+    for workout in workouts:
+        rows = workout_sets_models.build(workout)
+        session.add_all(rows)
+        weekly_rollups_models.apply(session, added=rows)
+        personal_records_models.apply(session, workout.item_id, added=rows)
+        created_count += len(rows)
+    
+    session.commit()
+    print(f"Backfilled {created_count} sets for {len(workouts)} workouts")
+    return created_count
+
+
+def main():
+    print("Starting workout sets backfill...")
+    init_db()
+    with Session(engine) as session:
+        backfill_workout_sets(session)
+    print("Workout sets backfill completed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Set-based helpers for the JSON importers: one key query per table, an in-memory diff,
+and batched INSERT ... ON CONFLICT DO NOTHING for whatever is missing
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Set
+from sqlmodel import Session, SQLModel, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+INSERT_BATCH_SIZE = 1000
+
+
+def existing_keys(session: Session, column) -> Set[Any]:
+    """Fetch every value of a key column in one query"""
+    return set(session.exec(select(column)).all())
+
+
+def to_row(obj: SQLModel) -> Dict[str, Any]:
+    """Column values of a built model object, ready for a bulk insert"""
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+def insert_missing(session: Session, model, rows: List[Dict[str, Any]]) -> int:
+    """Insert rows in executemany batches, skipping any that conflict with existing ones; commits"""
+    inserted_count = 0
+    statement = pg_insert(model).on_conflict_do_nothing().returning(*model.__table__.primary_key.columns)
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        result = session.execute(statement, rows[start:start + INSERT_BATCH_SIZE])
+        inserted_count += len(result.all())
+    session.commit()
+    return inserted_count
+
+
+@contextmanager
+def timed(timings: Dict[str, float], label: str):
+    """Record how long the block took, in milliseconds, under `label`"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[label] = (time.perf_counter() - started) * 1000
+
+
+def report(timings: Dict[str, float]):
+    """Print per-table load times"""
+    for label, elapsed in timings.items():
+        print(f"  {label}: {elapsed:.0f}ms")
+    print(f"  total: {sum(timings.values()):.0f}ms")
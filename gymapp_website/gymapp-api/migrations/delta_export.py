@@ -0,0 +1,317 @@
+"""
+Incremental JSON export: rows modified since the last export go to a new delta file next to
+the base snapshot, together with markers for rows deleted since (from their tombstones), and
+the deltas are periodically compacted into a fresh snapshot. Rows are
+streamed from the database and written one array element at a time, so memory stays flat.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import textwrap
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from uuid import UUID
+from sqlmodel import Session, select, func
+
+from models.sync import TombstonesDB
+
+JSON_COMPACT_ROWS = int(os.getenv("JSON_COMPACT_ROWS", "5000"))
+JSON_COMPACT_EVERY = int(os.getenv("JSON_COMPACT_EVERY", "50"))
+EXPORT_BATCH_SIZE = int(os.getenv("JSON_EXPORT_BATCH_SIZE", "1000"))
+# item_modified is stamped by the app (or taken from last_use by the activity flush) before commit,
+# so a row can commit below a mark already exported; deltas re-read this far behind the mark
+JSON_EXPORT_OVERLAP_SECONDS = float(os.getenv("JSON_EXPORT_OVERLAP_SECONDS", "60"))
+STATE_FILENAME = "export_state.json"
+
+
+def datetime_serializer(obj):
+    """JSON serializer for datetime objects"""
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+@contextmanager
+def atomic_file(filepath: str):
+    """Open a temp file in the target's directory and rename it over the target once the block succeeds"""
+    directory = os.path.dirname(filepath) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(filepath: str, data: Any, **dump_kwargs):
+    """Write JSON to a temp file in the same directory, then rename it over the target"""
+    with atomic_file(filepath) as f:
+        json.dump(data, f, default=datetime_serializer, **dump_kwargs)
+
+
+def write_json_array(filepath: str, records: Iterable[Dict[str, Any]], indent: Optional[int] = None) -> int:
+    """Write records as a JSON array one element at a time, atomically; returns how many were written.
+
+    The output matches json.dump(list(records), indent=indent), without ever holding the list.
+    """
+    count = 0
+    with atomic_file(filepath) as f:
+        f.write("[")
+        for record in records:
+            item = json.dumps(record, indent=indent, default=datetime_serializer)
+            if indent is not None:
+                f.write(("," if count else "") + "\n" + textwrap.indent(item, " " * indent))
+            else:
+                f.write((", " if count else "") + item)
+            count += 1
+        f.write("\n]" if count and indent is not None else "]")
+    return count
+
+
+def stream_rows(session: Session, statement) -> Iterator:
+    """Iterate a query's rows in EXPORT_BATCH_SIZE batches (a server-side cursor on Postgres)"""
+    return session.exec(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+
+
+def delta_paths(filepath: str) -> List[str]:
+    """Delta files for a base snapshot, oldest first"""
+    base, ext = os.path.splitext(filepath)
+    return sorted(glob.glob(f"{glob.escape(base)}.delta.*{ext}"))
+
+
+def load_records(filepath: str) -> Optional[List[Dict[str, Any]]]:
+    """Read a base snapshot merged with its deltas; None when neither exists.
+
+    Records are keyed by item_id and the most recently modified copy wins, so a
+    delta left behind by an interrupted compaction cannot override newer data.
+    Deletion markers win over the rows they delete and are then dropped.
+    """
+    paths = ([filepath] if os.path.exists(filepath) else []) + delta_paths(filepath)
+    if not paths:
+        return None
+
+    records = {}
+    for path in paths:
+        with open(path, 'r') as f:
+            for record in json.load(f):
+                key = record.get('item_id') or len(records)
+                current = records.get(key)
+                if current is None or record.get('item_modified', '') >= current.get('item_modified', ''):
+                    records[key] = record
+    return [record for record in records.values() if not record.get('deleted')]
+
+
+def load_state(data_path: str) -> Dict[str, Dict[str, Any]]:
+    """Per-table high-water marks and delta counters from the last export"""
+    state_path = os.path.join(data_path, STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return {}
+    try:
+        with open(state_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading export state, next export will compact: {str(e)}")
+        return {}
+
+
+def save_state(data_path: str, state: Dict[str, Dict[str, Any]]):
+    write_atomic(os.path.join(data_path, STATE_FILENAME), state, indent=2)
+
+
+def write_snapshot(session: Session, model, to_dict: Callable, filepath: str) -> int:
+    """Stream every row of a table into a base snapshot"""
+    rows = stream_rows(session, select(model))
+    return write_json_array(filepath, (to_dict(row) for row in rows), indent=2)
+
+
+def overlap_start(high_water: datetime) -> datetime:
+    """Start of the window a delta export re-reads below a high-water mark"""
+    return high_water - timedelta(seconds=JSON_EXPORT_OVERLAP_SECONDS)
+
+
+def deletion_marker(tombstone: TombstonesDB) -> Dict[str, Any]:
+    """Delta record that removes a deleted row when the files are loaded"""
+    return {'item_id': str(tombstone.item_id), 'item_modified': tombstone.deleted_at, 'deleted': True}
+
+
+def compact(
+    session: Session,
+    name: str,
+    model,
+    to_dict: Callable,
+    filepath: str,
+    state: Dict,
+    kind: Optional[str] = None
+) -> int:
+    """Replace the base snapshot and its deltas with a fresh snapshot"""
+    high_water = session.exec(select(func.max(model.item_modified))).one()
+    deleted_high_water = None
+    # Read before the snapshot, so every version recorded as exported is in it
+    exported = {}
+    if high_water is not None:
+        exported = {
+            str(item_id): item_modified.isoformat()
+            for item_id, item_modified in session.exec(
+                select(model.item_id, model.item_modified).where(model.item_modified > overlap_start(high_water))
+            )
+        }
+    if kind is not None:
+        deleted_high_water = session.exec(
+            select(func.max(TombstonesDB.deleted_at)).where(TombstonesDB.kind == kind)
+        ).one()
+        if deleted_high_water is not None:
+            exported.update({
+                str(item_id): deleted_at.isoformat()
+                for item_id, deleted_at in session.exec(
+                    select(TombstonesDB.item_id, TombstonesDB.deleted_at).where(
+                        TombstonesDB.kind == kind,
+                        TombstonesDB.deleted_at > overlap_start(deleted_high_water)
+                    )
+                )
+            })
+    count = write_snapshot(session, model, to_dict, filepath)
+    for path in delta_paths(filepath):
+        os.remove(path)
+    state[name] = {
+        'high_water': high_water.isoformat() if high_water else None,
+        'deleted_high_water': deleted_high_water.isoformat() if deleted_high_water else None,
+        'rows': count,
+        'delta_rows': 0,
+        'exports': 0,
+        'overlap': exported,
+    }
+    print(f"Compacted {count} {name} into {filepath}")
+    return count
+
+
+def needs_compaction(table_state: Dict, filepath: str) -> bool:
+    return (
+        not table_state
+        or not os.path.exists(filepath)
+        or table_state.get('delta_rows', 0) >= JSON_COMPACT_ROWS
+        or table_state.get('exports', 0) >= JSON_COMPACT_EVERY
+    )
+
+
+def export_table(
+    session: Session,
+    name: str,
+    model,
+    to_dict: Callable,
+    filepath: str,
+    state: Dict,
+    full: bool = False,
+    kind: Optional[str] = None
+) -> int:
+    """Export rows modified since the table's high-water mark to a new delta file, compacting when due.
+
+    Rows up to JSON_EXPORT_OVERLAP_SECONDS older than the mark are read again,
+    so a row that committed after the last export with an earlier
+    item_modified is not lost. The state keeps the item_modified exported for
+    each row in that window, so re-read rows are only written when they
+    changed; load_records keeps one copy per item_id either way.
+
+    Tables whose deletions leave tombstones of `kind` get a deletion marker
+    per tombstone since the last export. Other tables have no record of
+    deletions, so they are compacted when they hold fewer rows than at the
+    last export.
+    """
+    table_state = state.get(name, {})
+    rows_now = None
+    if kind is None and not full and table_state.get('rows') is not None:
+        rows_now = session.exec(select(func.count(model.item_id))).one()
+        if rows_now < table_state['rows']:
+            print(f"{table_state['rows'] - rows_now} {name} were deleted since the last export")
+            full = True
+    if full or needs_compaction(table_state, filepath):
+        return compact(session, name, model, to_dict, filepath, state, kind)
+
+    previous = datetime.fromisoformat(table_state['high_water']) if table_state.get('high_water') else None
+    high_water = session.exec(select(func.max(model.item_modified))).one()
+    if previous is not None:
+        high_water = max(high_water or previous, previous)
+
+    statement = None
+    if high_water is not None:
+        statement = select(model).where(model.item_modified <= high_water)
+        if previous is not None:
+            statement = statement.where(model.item_modified > overlap_start(previous))
+
+    deleted_previous = table_state.get('deleted_high_water')
+    deleted_previous = datetime.fromisoformat(deleted_previous) if deleted_previous else None
+    deleted_high_water = deleted_previous
+    tombstones = None
+    if kind is not None:
+        deleted_high_water = session.exec(
+            select(func.max(TombstonesDB.deleted_at)).where(TombstonesDB.kind == kind)
+        ).one()
+        if deleted_previous is not None:
+            deleted_high_water = max(deleted_high_water or deleted_previous, deleted_previous)
+        if deleted_high_water is not None:
+            tombstones = select(TombstonesDB).where(
+                TombstonesDB.kind == kind, TombstonesDB.deleted_at <= deleted_high_water
+            )
+            if deleted_previous is not None:
+                tombstones = tombstones.where(TombstonesDB.deleted_at > overlap_start(deleted_previous))
+
+    if high_water is None and deleted_high_water is None:
+        print(f"No {name} to export")
+        return 0
+
+    seen = table_state.get('overlap', {})
+    windows = [overlap_start(mark) for mark in (high_water, deleted_high_water) if mark is not None]
+    exported = {
+        item_id: modified for item_id, modified in seen.items()
+        if any(datetime.fromisoformat(modified) > window for window in windows)
+    }
+
+    def changed(item_id: str, modified: datetime, window: Optional[datetime]) -> bool:
+        if seen.get(item_id) == modified.isoformat():
+            return False
+        if window is not None and modified > window:
+            exported[item_id] = modified.isoformat()
+        return True
+
+    def changed_rows():
+        if statement is not None:
+            window = overlap_start(high_water)
+            for row in stream_rows(session, statement.order_by(model.item_modified)):
+                if changed(str(row.item_id), row.item_modified, window):
+                    yield to_dict(row)
+        if tombstones is not None:
+            window = overlap_start(deleted_high_water)
+            for tombstone in stream_rows(session, tombstones.order_by(TombstonesDB.deleted_at)):
+                if changed(str(tombstone.item_id), tombstone.deleted_at, window):
+                    yield deletion_marker(tombstone)
+
+    base, ext = os.path.splitext(filepath)
+    delta_path = f"{base}.delta.{datetime.now().strftime('%Y%m%dT%H%M%S%f')}{ext}"
+    count = write_json_array(delta_path, changed_rows())
+    if count == 0:
+        os.remove(delta_path)
+    if rows_now is None:
+        rows_now = session.exec(select(func.count(model.item_id))).one()
+    state[name] = {
+        'high_water': high_water.isoformat() if high_water else None,
+        'deleted_high_water': deleted_high_water.isoformat() if deleted_high_water else None,
+        'rows': rows_now,
+        'delta_rows': table_state.get('delta_rows', 0) + count,
+        'exports': table_state.get('exports', 0) + (1 if count else 0),
+        'overlap': exported,
+    }
+    if count:
+        print(f"Exported {count} changed {name} to {delta_path}")
+    else:
+        print(f"No {name} changed since the last export")
+    return count
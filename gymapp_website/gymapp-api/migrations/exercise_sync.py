@@ -8,6 +8,8 @@ from models import (
 from utils.auth import hash_password
 from typing import List, Dict, Any
 from uuid import UUID
+from .bulk_load import existing_keys, to_row, insert_missing
+from .delta_export import load_records, write_snapshot
 
 JSON_DATA_PATH = os.getenv("JSON_DATA_PATH", "./reference_data")
 
@@ -26,22 +28,17 @@ def import_exercises_from_json(session: Session, filepath: str = None) -> int:
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "exercises.json")
     
-    if not os.path.exists(filepath):
-        print(f"No exercises file found at {filepath}")
-        return 0
-    
     try:
-        with open(filepath, 'r') as f:
-            exercise_data = json.load(f)
+        exercise_data = load_records(filepath)
+        if exercise_data is None:
+            print(f"No exercises file found at {filepath}")
+            return 0
         
-        imported_count = 0
+        names = existing_keys(session, exercises_models.ExercisesDB.name)
+        rows = []
         for exercise in exercise_data:
             try:
-                existing = session.exec(
-                    select(exercises_models.ExercisesDB).where(exercises_models.ExercisesDB.name == exercise['name'])
-                ).first()
-                
-                if existing:
+                if exercise['name'] in names:
                     continue
 
                 exercise_obj = exercises_models.ExercisesDB(**exercise)
@@ -57,14 +54,15 @@ def import_exercises_from_json(session: Session, filepath: str = None) -> int:
                 if 'item_modified' in exercise:
                     exercise_obj.item_modified = datetime.fromisoformat(exercise['item_modified']) if isinstance(exercise['item_modified'], str) else exercise['item_modified']
                 
-                session.add(exercise_obj)
-                imported_count += 1
+                rows.append(to_row(exercise_obj))
+                names.add(exercise_obj.name)
                 
             except Exception as e:
                 print(f"Error importing exercise {exercise.get('name', 'unknown')}: {str(e)}")
                 continue
         
-        session.commit()
+        imported_count = insert_missing(session, exercises_models.ExercisesDB, rows)
+        exercises_models.invalidate_catalog()
         print(f"Imported {imported_count} exercise from JSON")
         return imported_count
         
@@ -72,38 +70,30 @@ def import_exercises_from_json(session: Session, filepath: str = None) -> int:
         print(f"Error reading exercises file: {str(e)}")
         return 0
 
+def exercise_to_dict(exercise: exercises_models.ExercisesDB) -> Dict[str, Any]:
+    """JSON shape of an exercise row"""
+    return {
+        'item_id': str(exercise.item_id),
+        'item_created': exercise.item_created.isoformat(),
+        'item_modified': exercise.item_modified.isoformat(),
+        'name': exercise.name,
+        'description': exercise.description,
+        'category': exercise.category,
+        'equipment': exercise.equipment,
+        'muscles': exercise.muscles,
+        'sub_muscles': exercise.sub_muscles,
+    }
+
 def export_exercises_to_json(session: Session, filepath: str = None) -> int:
     """Export exercises to JSON file"""
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "exercises.json")
     
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        exercises = session.exec(select(exercises_models.ExercisesDB)).all()
-        
-        exercises_data = []
-        for exercise in exercises:
-            exercise_dict = {
-                'item_id': str(exercise.item_id),
-                'item_created': exercise.item_created.isoformat(),
-                'item_modified': exercise.item_modified.isoformat(),
-                'name': exercise.name,
-                'description': exercise.description,
-                'category': exercise.category,
-                'equipment': exercise.equipment,
-                'muscles': exercise.muscles,
-                'sub_muscles': exercise.sub_muscles,
-            }
-            exercises_data.append(exercise_dict)
-        
-        with open(filepath, 'w') as f:
-            json.dump(exercises_data, f, indent=2, default=datetime_serializer)
-        
-        print(f"Exported {len(exercises_data)} exercises to {filepath}")
-        return len(exercises_data)
+        count = write_snapshot(session, exercises_models.ExercisesDB, exercise_to_dict, filepath)
+        print(f"Exported {count} exercises to {filepath}")
+        return count
         
     except Exception as e:
         print(f"Error exporting exercises: {str(e)}")
         return 0
-
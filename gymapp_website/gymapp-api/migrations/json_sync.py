@@ -4,15 +4,27 @@ from datetime import datetime
 from sqlmodel import Session, select
 from models import (
     users as users_models,
+    exercises as exercises_models,
+    workouts as workouts_models,
+    planned_workouts as planned_workouts_models,
 )
 from utils.auth import hash_password
 from typing import List, Dict, Any
 from uuid import UUID
-from .exercise_sync import import_exercises_from_json, export_exercises_to_json
-from .workouts_sync import import_workouts_from_json, export_workouts_to_json
-from .planned_workouts_sync import import_planned_workouts_from_json, export_planned_workouts_to_json
+from .exercise_sync import import_exercises_from_json, export_exercises_to_json, exercise_to_dict
+from .workouts_sync import import_workouts_from_json, export_workouts_to_json, workout_to_dict
+from .planned_workouts_sync import (
+    import_planned_workouts_from_json,
+    export_planned_workouts_to_json,
+    planned_workout_to_dict,
+)
+from .backfill_workout_sets import backfill_workout_sets
+from .bulk_load import existing_keys, to_row, insert_missing, timed, report
+from .delta_export import load_records, write_snapshot, load_state, save_state, export_table
 
 JSON_DATA_PATH = os.getenv("JSON_DATA_PATH", "./reference_data")
+# "delta" writes only rows changed since the last export (compacting when due); "full" rewrites every file
+JSON_EXPORT_MODE = os.getenv("JSON_EXPORT_MODE", "delta").lower()
 
 def datetime_serializer(obj):
     """JSON serializer for datetime objects"""
@@ -27,23 +39,17 @@ def import_users_from_json(session: Session, filepath: str = None) -> int:
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "users.json")
     
-    if not os.path.exists(filepath):
-        print(f"No users file found at {filepath}")
-        return 0
-    
     try:
-        with open(filepath, 'r') as f:
-            users_data = json.load(f)
+        users_data = load_records(filepath)
+        if users_data is None:
+            print(f"No users file found at {filepath}")
+            return 0
         
-        imported_count = 0
+        usernames = existing_keys(session, users_models.UsersDB.username)
+        rows = []
         for user_data in users_data:
             try:
-                existing = session.exec(
-                    select(users_models.UsersDB).where(users_models.UsersDB.username == user_data['username'])
-                ).first()
-                
-                if existing:
-                    print(f"User {user_data['username']} already exists, skipping...")
+                if user_data['username'] in usernames:
                     continue
                 
                 if isinstance(user_data.get('last_use'), str):
@@ -70,14 +76,14 @@ def import_users_from_json(session: Session, filepath: str = None) -> int:
                 if 'item_modified' in user_data:
                     db_user.item_modified = datetime.fromisoformat(user_data['item_modified']) if isinstance(user_data['item_modified'], str) else user_data['item_modified']
                 
-                session.add(db_user)
-                imported_count += 1
+                rows.append(to_row(db_user))
+                usernames.add(db_user.username)
                 
             except Exception as e:
                 print(f"Error importing user {user_data.get('username', 'unknown')}: {str(e)}")
                 continue
         
-        session.commit()
+        imported_count = insert_missing(session, users_models.UsersDB, rows)
         print(f"Imported {imported_count} users from JSON")
         return imported_count
         
@@ -85,41 +91,34 @@ def import_users_from_json(session: Session, filepath: str = None) -> int:
         print(f"Error reading users file: {str(e)}")
         return 0
 
+def user_to_dict(user: users_models.UsersDB) -> Dict[str, Any]:
+    """JSON shape of a user row"""
+    return {
+        'item_id': str(user.item_id),
+        'item_created': user.item_created.isoformat(),
+        'item_modified': user.item_modified.isoformat(),
+        'username': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'age': user.age,
+        'height': user.height,
+        'weight': user.weight,
+        'sex': user.sex,
+        'experience': user.experience,
+        'last_use': user.last_use.isoformat(),
+        'goal': user.goal,
+        'hashed_password': user.hashed_password
+    }
+
 def export_users_to_json(session: Session, filepath: str = None) -> int:
     """Export users to JSON file"""
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "users.json")
     
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        users = session.exec(select(users_models.UsersDB)).all()
-        
-        users_data = []
-        for user in users:
-            user_dict = {
-                'item_id': str(user.item_id),
-                'item_created': user.item_created.isoformat(),
-                'item_modified': user.item_modified.isoformat(),
-                'username': user.username,
-                'first_name': user.first_name,
-                'last_name': user.last_name,
-                'age': user.age,
-                'height': user.height,
-                'weight': user.weight,
-                'sex': user.sex,
-                'experience': user.experience,
-                'last_use': user.last_use.isoformat(),
-                'goal': user.goal,
-                'hashed_password': user.hashed_password
-            }
-            users_data.append(user_dict)
-        
-        with open(filepath, 'w') as f:
-            json.dump(users_data, f, indent=2, default=datetime_serializer)
-        
-        print(f"Exported {len(users_data)} users to {filepath}")
-        return len(users_data)
+        count = write_snapshot(session, users_models.UsersDB, user_to_dict, filepath)
+        print(f"Exported {count} users to {filepath}")
+        return count
         
     except Exception as e:
         print(f"Error exporting users: {str(e)}")
@@ -129,20 +128,44 @@ def import_all_data(session: Session):
     """Import all data from JSON files"""
     print("Starting data import...")
     
-    import_users_from_json(session)
-    import_exercises_from_json(session)
-    import_workouts_from_json(session)
-    import_planned_workouts_from_json(session)
+    timings = {}
+    with timed(timings, "users"):
+        import_users_from_json(session)
+    with timed(timings, "exercises"):
+        import_exercises_from_json(session)
+    with timed(timings, "workouts"):
+        import_workouts_from_json(session)
+    with timed(timings, "workout_sets backfill"):
+        backfill_workout_sets(session)
+    with timed(timings, "planned_workouts"):
+        import_planned_workouts_from_json(session)
     
     print("Data import completed")
+    report(timings)
 
-def export_all_data(session: Session):
-    """Export all data to JSON files"""
-    print("Starting data export...")
+def export_all_data(session: Session, full: bool = False):
+    """Export all data to JSON files, as deltas unless a full export is asked for or configured"""
+    full = full or JSON_EXPORT_MODE == "full"
+    print(f"Starting {'full' if full else 'delta'} data export...")
+    
+    # name, model, serializer and the tombstone kind recorded when its rows are deleted
+    tables = [
+        ("users", users_models.UsersDB, user_to_dict, None),
+        ("exercises", exercises_models.ExercisesDB, exercise_to_dict, None),
+        ("workouts", workouts_models.WorkoutsDB, workout_to_dict, "workout"),
+        ("planned_workouts", planned_workouts_models.PlannedWorkoutsDB, planned_workout_to_dict, "planned_workout"),
+    ]
     
-    export_users_to_json(session)
-    export_exercises_to_json(session)
-    export_workouts_to_json(session)
-    export_planned_workouts_to_json(session)
+    state = load_state(JSON_DATA_PATH)
+    timings = {}
+    for name, model, to_dict, kind in tables:
+        filepath = os.path.join(JSON_DATA_PATH, f"{name}.json")
+        try:
+            with timed(timings, name):
+                export_table(session, name, model, to_dict, filepath, state, full=full, kind=kind)
+        except Exception as e:
+            print(f"Error exporting {name}: {str(e)}")
+    save_state(JSON_DATA_PATH, state)
     
-    print("Data export completed")
\ No newline at end of file
+    print("Data export completed")
+    report(timings)
@@ -10,6 +10,8 @@ from models import (
 from utils.auth import hash_password
 from typing import List, Dict, Any
 from uuid import UUID
+from .bulk_load import existing_keys, to_row, insert_missing
+from .delta_export import load_records, write_snapshot
 
 JSON_DATA_PATH = os.getenv("JSON_DATA_PATH", "./reference_data")
 
@@ -28,22 +30,17 @@ def import_planned_workouts_from_json(session: Session, filepath: str = None) ->
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "planned_workouts.json")
     
-    if not os.path.exists(filepath):
-        print(f"No workouts file found at {filepath}")
-        return 0
-    
     try:
-        with open(filepath, 'r') as f:
-            workout_data = json.load(f)
+        workout_data = load_records(filepath)
+        if workout_data is None:
+            print(f"No workouts file found at {filepath}")
+            return 0
         
-        imported_count = 0
+        workout_ids = existing_keys(session, planned_workouts_models.PlannedWorkoutsDB.item_id)
+        rows = []
         for workout in workout_data:
             try:
-                existing = session.exec(
-                    select(planned_workouts_models.PlannedWorkoutsDB).where(planned_workouts_models.PlannedWorkoutsDB.item_id == workout['item_id'])
-                ).first()
-                
-                if existing:
+                if UUID(workout['item_id']) in workout_ids:
                     continue
 
                 workout_obj = planned_workouts_models.PlannedWorkoutsDB(**workout)
@@ -59,14 +56,14 @@ def import_planned_workouts_from_json(session: Session, filepath: str = None) ->
                 if 'item_modified' in workout:
                     workout_obj.item_modified = datetime.fromisoformat(workout['item_modified']) if isinstance(workout['item_modified'], str) else workout_data['item_modified']
                 
-                session.add(workout_obj)
-                imported_count += 1
+                rows.append(to_row(workout_obj))
+                workout_ids.add(workout_obj.item_id)
                 
             except Exception as e:
                 print(f"Error importing exercise {workout.get('item_id', 'unknown')}: {str(e)}")
                 continue
         
-        session.commit()
+        imported_count = insert_missing(session, planned_workouts_models.PlannedWorkoutsDB, rows)
         print(f"Imported {imported_count} planned workouts from JSON")
         return imported_count
         
@@ -74,39 +71,29 @@ def import_planned_workouts_from_json(session: Session, filepath: str = None) ->
         print(f"Error reading planned workouts file: {str(e)}")
         return 0
 
+def planned_workout_to_dict(workout: planned_workouts_models.PlannedWorkoutsDB) -> Dict[str, Any]:
+    """JSON shape of a planned workout row"""
+    return {
+        'item_id': str(workout.item_id),
+        'item_created': workout.item_created.isoformat(),
+        'item_modified': workout.item_modified.isoformat(),
+        'name': workout.name,
+        'notes': workout.notes,
+        'exercises': [str(ex_id) for ex_id in workout.exercises],
+        'exercise_performances': workout.exercise_performances,
+        'user_id': str(workout.user_id)
+    }
+
 def export_planned_workouts_to_json(session: Session, filepath: str = None) -> int:
     """Export workouts to JSON file"""
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "planned_workouts.json")
     
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        workouts = session.exec(select(planned_workouts_models.PlannedWorkoutsDB)).all()
-        
-        workouts_data = []
-        for workout in workouts:
-            exercise_dict = {
-                'name': str(workout.name),
-                'item_id': str(workout.item_id),
-                'item_created': workout.item_created.isoformat(),
-                'item_modified': workout.item_modified.isoformat(),
-                'name': workout.name,
-                'description': workout.description,
-                'category': workout.category,
-                'equipment': workout.equipment,
-                'muscles': workout.muscles,
-                'sub_muscles': workout.sub_muscles,
-            }
-            workouts_data.append(exercise_dict)
-        
-        with open(filepath, 'w') as f:
-            json.dump(workouts_data, f, indent=2, default=datetime_serializer)
-        
-        print(f"Exported {len(workouts_data)} planned workouts to {filepath}")
-        return len(workouts_data)
+        count = write_snapshot(session, planned_workouts_models.PlannedWorkoutsDB, planned_workout_to_dict, filepath)
+        print(f"Exported {count} planned workouts to {filepath}")
+        return count
         
     except Exception as e:
         print(f"Error exporting planned workouts: {str(e)}")
         return 0
-
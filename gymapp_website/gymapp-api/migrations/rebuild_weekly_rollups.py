@@ -0,0 +1,25 @@
+"""
+Migration script to rebuild the weekly_rollups table from workout_sets
+"""
+
+import os
+import sys
+from sqlmodel import Session
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import workouts as workouts_models
+from models import weekly_rollups as weekly_rollups_models
+from utils.db import engine, init_db
+
+
+def main():
+    print("Starting weekly rollups rebuild...")
+    init_db()
+    with Session(engine) as session:
+        weekly_rollups_models.rebuild(session)
+    print("Weekly rollups rebuild completed")
+
+
+if __name__ == "__main__":
+    main()
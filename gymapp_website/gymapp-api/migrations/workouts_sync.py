@@ -10,6 +10,8 @@ from models import (
 from utils.auth import hash_password
 from typing import List, Dict, Any
 from uuid import UUID
+from .bulk_load import existing_keys, to_row, insert_missing
+from .delta_export import load_records, write_snapshot
 
 JSON_DATA_PATH = os.getenv("JSON_DATA_PATH", "./reference_data")
 
@@ -28,24 +30,17 @@ def import_workouts_from_json(session: Session, filepath: str = None) -> int:
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "workouts.json")
     
-    if not os.path.exists(filepath):
-        print(f"No workouts file found at {filepath}")
-        return 0
-    
     try:
-        with open(filepath, 'r') as f:
-            workout_data = json.load(f)
+        workout_data = load_records(filepath)
+        if workout_data is None:
+            print(f"No workouts file found at {filepath}")
+            return 0
         
-        imported_count = 0
+        workout_ids = existing_keys(session, workouts_models.WorkoutsDB.item_id)
+        rows = []
         for workout in workout_data:
             try:
-                existing = session.exec(
-                    select(workouts_models.WorkoutsDB).where(
-                        workouts_models.WorkoutsDB.item_id == UUID(workout['item_id'])
-                    )
-                ).first()
-                
-                if existing:
+                if UUID(workout['item_id']) in workout_ids:
                     continue
 
                 workout_obj = workouts_models.WorkoutsDB(
@@ -69,14 +64,14 @@ def import_workouts_from_json(session: Session, filepath: str = None) -> int:
                 if 'item_modified' in workout:
                     workout_obj.item_modified = datetime.fromisoformat(workout['item_modified']) if isinstance(workout['item_modified'], str) else workout['item_modified']
                 
-                session.add(workout_obj)
-                imported_count += 1
+                rows.append(to_row(workout_obj))
+                workout_ids.add(workout_obj.item_id)
                 
             except Exception as e:
                 print(f"Error importing workout {workout.get('item_id', 'unknown')}: {str(e)}")
                 continue
         
-        session.commit()
+        imported_count = insert_missing(session, workouts_models.WorkoutsDB, rows)
         print(f"Imported {imported_count} workouts from JSON")
         return imported_count
         
@@ -85,40 +80,34 @@ def import_workouts_from_json(session: Session, filepath: str = None) -> int:
         return 0
 
 
+def workout_to_dict(workout: workouts_models.WorkoutsDB) -> Dict[str, Any]:
+    """JSON shape of a workout row"""
+    return {
+        'item_id': str(workout.item_id),
+        'item_created': workout.item_created.isoformat(),
+        'item_modified': workout.item_modified.isoformat(),
+        'name': workout.name,
+        'date': workout.date.isoformat() if workout.date else None,
+        'start_time': workout.start_time.isoformat() if workout.start_time else None,
+        'end_time': workout.end_time.isoformat() if workout.end_time else None,
+        'duration': workout.duration,
+        'notes': workout.notes,
+        'exercises': [str(ex_id) for ex_id in workout.exercises],
+        'exercise_performances': workout.exercise_performances, 
+        'user_id': str(workout.user_id)
+    }
+
+
 def export_workouts_to_json(session: Session, filepath: str = None) -> int:
     """Export workouts to JSON file"""
     if filepath is None:
         filepath = os.path.join(JSON_DATA_PATH, "workouts.json")
     
     try:
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        workouts = session.exec(select(workouts_models.WorkoutsDB)).all()
-        
-        workouts_data = []
-        for workout in workouts:
-            workout_dict = {
-                'item_id': str(workout.item_id),
-                'item_created': workout.item_created.isoformat(),
-                'item_modified': workout.item_modified.isoformat(),
-                'name': workout.name,
-                'date': workout.date.isoformat() if workout.date else None,
-                'start_time': workout.start_time.isoformat() if workout.start_time else None,
-                'end_time': workout.end_time.isoformat() if workout.end_time else None,
-                'duration': workout.duration,
-                'notes': workout.notes,
-                'exercises': [str(ex_id) for ex_id in workout.exercises],
-                'exercise_performances': workout.exercise_performances, 
-                'user_id': str(workout.user_id)
-            }
-            workouts_data.append(workout_dict)
-        
-        with open(filepath, 'w') as f:
-            json.dump(workouts_data, f, indent=2, default=datetime_serializer)
-        
-        print(f"Exported {len(workouts_data)} workouts to {filepath}")
-        return len(workouts_data)
+        count = write_snapshot(session, workouts_models.WorkoutsDB, workout_to_dict, filepath)
+        print(f"Exported {count} workouts to {filepath}")
+        return count
         
     except Exception as e:
         print(f"Error exporting workouts: {str(e)}")
-        return 0
\ No newline at end of file
+        return 0
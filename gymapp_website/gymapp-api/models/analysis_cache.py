@@ -0,0 +1,31 @@
+from sqlmodel import Session, SQLModel, Field
+from sqlalchemy import delete
+from typing import Optional
+from datetime import datetime, timedelta
+
+
+class AnalysisCacheDB(SQLModel, table=True):
+    """Stored Claude answers for option prompts, keyed by a hash of the full request"""
+    __tablename__ = "analysis_cache"
+    cache_key: str = Field(primary_key=True, max_length=64)
+    option: str
+    model: str
+    message: str
+    created_at: datetime = Field(default_factory=datetime.now, index=True)
+
+
+def get(session: Session, cache_key: str, ttl_seconds: int) -> Optional[str]:
+    """Get a stored answer younger than the TTL"""
+    entry = session.get(AnalysisCacheDB, cache_key)
+    if entry is None or entry.created_at < datetime.now() - timedelta(seconds=ttl_seconds):
+        return None
+    return entry.message
+
+
+def put(session: Session, cache_key: str, option: str, model: str, message: str, ttl_seconds: int):
+    """Store or replace an answer, deleting answers older than the TTL in the same transaction"""
+    session.execute(
+        delete(AnalysisCacheDB).where(AnalysisCacheDB.created_at < datetime.now() - timedelta(seconds=ttl_seconds))
+    )
+    session.merge(AnalysisCacheDB(cache_key=cache_key, option=option, model=model, message=message))
+    session.commit()
@@ -0,0 +1,48 @@
+from sqlmodel import Session, SQLModel, Field
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from datetime import date
+from uuid import UUID
+
+
+class AnalysisUsageDB(SQLModel, table=True):
+    """Model calls made for a user on one day, for the daily analysis quota"""
+    __tablename__ = "analysis_usage"
+    user_id: UUID = Field(foreign_key="users.item_id", primary_key=True)
+    day: date = Field(primary_key=True)
+    message_count: int = 0
+
+
+def get_used(session: Session, user_id: UUID) -> int:
+    """Get how many model calls a user has made today"""
+    usage = session.get(AnalysisUsageDB, (user_id, date.today()))
+    return usage.message_count if usage else 0
+
+
+def reserve(session: Session, user_id: UUID, daily_limit: int) -> bool:
+    """Count one model call against today's quota, atomically; returns False when the quota is used up"""
+    if daily_limit <= 0:
+        return False
+    statement = pg_insert(AnalysisUsageDB).values(user_id=user_id, day=date.today(), message_count=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[AnalysisUsageDB.user_id, AnalysisUsageDB.day],
+        set_={"message_count": AnalysisUsageDB.message_count + 1},
+        where=AnalysisUsageDB.message_count < daily_limit
+    ).returning(AnalysisUsageDB.message_count)
+    reserved = session.execute(statement).first() is not None
+    session.commit()
+    return reserved
+
+
+def refund(session: Session, user_id: UUID):
+    """Give back a reserved call that never reached the model"""
+    session.execute(
+        update(AnalysisUsageDB)
+        .where(
+            AnalysisUsageDB.user_id == user_id,
+            AnalysisUsageDB.day == date.today(),
+            AnalysisUsageDB.message_count > 0
+        )
+        .values(message_count=AnalysisUsageDB.message_count - 1)
+    )
+    session.commit()
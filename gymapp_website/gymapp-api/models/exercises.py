@@ -1,5 +1,11 @@
+import json
+import hashlib
+import threading
+from dataclasses import dataclass
 from sqlmodel import Session, select, SQLModel, Field, JSON, Column
-from typing import List
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from fastapi.encoders import jsonable_encoder
+from typing import List, Dict, Any, Iterable, Tuple
 from models.base import Base
 from typing import Optional
 from datetime import datetime
@@ -23,10 +29,193 @@ class ExercisesCreate(ExercisesBase):
     pass
 
 
+@dataclass(frozen=True)
+class ExerciseCatalog:
+    """Serialized GET /exercises response and its version hash"""
+    body: bytes
+    etag: str
+
+
+_catalog: Optional[ExerciseCatalog] = None
+_catalog_version = 0
+_catalog_lock = threading.Lock()
+
+
 def create(session: Session, data: ExercisesCreate) -> ExercisesDB:
     """Create a new exercise"""
     db_exercise = ExercisesDB(**data.dict())
     session.add(db_exercise)
     session.commit()
     session.refresh(db_exercise)
-    return db_exercise
\ No newline at end of file
+    invalidate_catalog()
+    return db_exercise
+
+
+def get_catalog(session: Session) -> ExerciseCatalog:
+    """Get the cached exercise catalog, building it on first use.
+
+    The query runs outside the lock: under an AsyncSession it suspends the
+    calling greenlet, and holding a thread lock across that would block the
+    event loop. A build that raced with invalidate_catalog() is served but
+    not cached.
+    """
+    global _catalog
+    catalog = _catalog
+    if catalog is not None:
+        return catalog
+
+    version = _catalog_version
+    exercises = session.exec(select(ExercisesDB)).all()
+    payload = {
+        "exercises": exercises,
+        "categories": list(dict.fromkeys(exercise.category for exercise in exercises)),
+        "equipment": list(dict.fromkeys(exercise.equipment for exercise in exercises)),
+    }
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+    catalog = ExerciseCatalog(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"')
+
+    with _catalog_lock:
+        if _catalog_version == version:
+            _catalog = catalog
+    return catalog
+
+
+def invalidate_catalog():
+    """Drop the cached exercise catalog so the next read rebuilds it"""
+    global _catalog, _catalog_version
+    with _catalog_lock:
+        _catalog = None
+        _catalog_version += 1
+
+
+def get_by_ids(session: Session, exercise_ids: Iterable[UUID]) -> Dict[UUID, ExercisesDB]:
+    """Get exercises keyed by id, resolved in a single IN query"""
+    ids = {UUID(str(exercise_id)) for exercise_id in exercise_ids}
+    if not ids:
+        return {}
+    statement = select(ExercisesDB).where(ExercisesDB.item_id.in_(ids))
+    return {exercise.item_id: exercise for exercise in session.exec(statement).all()}
+
+
+def create_data_for(exercise_data: Dict[str, Any]) -> ExercisesCreate:
+    """Build the new-exercise payload for a workout entry whose exercise is not in the catalog"""
+    if not exercise_data.get('item_id'):
+        exercise_details = exercise_data.get('exerciseDetails', {})
+        return ExercisesCreate(
+            name=exercise_data.get('name', exercise_details.get('name', '')),
+            description=exercise_details.get('description', ''),
+            category=exercise_details.get('category', 'Strength'),
+            equipment=exercise_details.get('equipment', 'None'),
+            muscles=exercise_details.get('muscles', []),
+            sub_muscles=exercise_details.get('sub_muscles', [])
+        )
+    return ExercisesCreate(
+        name=exercise_data.get('name', ''),
+        description=exercise_data.get('description', ''),
+        category=exercise_data.get('category', 'Strength'),
+        equipment=exercise_data.get('equipment', 'None'),
+        muscles=exercise_data.get('muscles', []),
+        sub_muscles=exercise_data.get('sub_muscles', [])
+    )
+
+
+def resolve(session: Session, entries: List[Dict[str, Any]]) -> Tuple[List[UUID], int]:
+    """Resolve workout entries to exercise ids, upserting unknown exercises in one statement.
+
+    Known ids are checked with one query and entries without one are matched
+    by name with another; only names still missing are inserted, with
+    ON CONFLICT (name), which returns the id of the existing row when another
+    request created the same exercise first. Nothing is committed: the caller
+    commits and then calls invalidate_catalog() if the returned count is
+    non-zero. Returns the ids in entry order and the number of new names.
+    """
+    known = get_by_ids(
+        session,
+        (entry['item_id'] for entry in entries if entry.get('item_id'))
+    )
+
+    pending = {}
+    for entry in entries:
+        item_id = entry.get('item_id')
+        if not item_id or UUID(str(item_id)) not in known:
+            data = create_data_for(entry)
+            pending.setdefault(data.name, data)
+
+    by_name = {}
+    if pending:
+        existing = session.exec(
+            select(ExercisesDB.item_id, ExercisesDB.name).where(ExercisesDB.name.in_(list(pending)))
+        ).all()
+        by_name = {name: item_id for item_id, name in existing}
+        pending = {name: data for name, data in pending.items() if name not in by_name}
+
+    if pending:
+        rows = []
+        for data in pending.values():
+            exercise = ExercisesDB(**data.dict())
+            rows.append({column.key: getattr(exercise, column.key) for column in ExercisesDB.__table__.columns})
+        statement = pg_insert(ExercisesDB).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ExercisesDB.name],
+            set_={"name": statement.excluded.name}
+        ).returning(ExercisesDB.item_id, ExercisesDB.name)
+        by_name.update({name: item_id for item_id, name in session.execute(statement).all()})
+
+    exercise_ids = []
+    for entry in entries:
+        item_id = entry.get('item_id')
+        if item_id and UUID(str(item_id)) in known:
+            exercise_ids.append(UUID(str(item_id)))
+        else:
+            exercise_ids.append(by_name[create_data_for(entry).name])
+    return exercise_ids, len(pending)
+
+
+def build_performances(exercise_ids: List[UUID], entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Build exercise_performances from resolved exercise ids and their workout entries"""
+    return [
+        {'exercise_id': str(exercise_id), 'sets': entry.get('sets', [])}
+        for exercise_id, entry in zip(exercise_ids, entries)
+    ]
+
+
+def to_detail(exercise: ExercisesDB, sets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Serialize an exercise together with the sets performed for it"""
+    return {
+        "item_id": str(exercise.item_id),
+        "name": exercise.name,
+        "description": exercise.description,
+        "category": exercise.category,
+        "equipment": exercise.equipment,
+        "muscles": exercise.muscles,
+        "sub_muscles": exercise.sub_muscles,
+        "sets": sets
+    }
+
+
+def hydrate(session: Session, workouts: List[Any]) -> List[List[Dict[str, Any]]]:
+    """Get exercise details with sets for each workout (or planned workout).
+
+    Every exercise referenced across ``workouts`` is loaded with one query, so
+    the number of queries does not grow with the number of workouts.
+    """
+    exercises_by_id = get_by_ids(
+        session,
+        (exercise_id for workout in workouts for exercise_id in workout.exercises)
+    )
+
+    hydrated = []
+    for workout in workouts:
+        details = []
+        for i, exercise_id in enumerate(workout.exercises):
+            exercise = exercises_by_id.get(UUID(str(exercise_id)))
+            if not exercise:
+                continue
+            sets = []
+            if i < len(workout.exercise_performances):
+                performance = workout.exercise_performances[i]
+                if performance.get('exercise_id') == str(exercise_id):
+                    sets = performance.get('sets', [])
+            details.append(to_detail(exercise, sets))
+        hydrated.append(details)
+    return hydrated
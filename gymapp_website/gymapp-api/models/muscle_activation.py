@@ -0,0 +1,113 @@
+import json
+import threading
+from dataclasses import dataclass
+from sqlmodel import Session, select
+from sqlalchemy import func
+from typing import List, Dict, Any, Optional
+from datetime import date
+from uuid import UUID
+
+import numpy as np
+
+from models import exercises as exercises_models
+from models import workouts as workouts_models
+from models.workout_sets import WorkoutSetsDB
+
+PRIMARY_MUSCLE_WEIGHT = 1.0
+SUB_MUSCLE_WEIGHT = 0.5
+# Muscles AnatomyHeatmap.vue always lists, even at zero
+HEATMAP_MUSCLES = [
+    'Chest', 'Back', 'Shoulders', 'Biceps', 'Triceps',
+    'Quadriceps', 'Hamstrings', 'Glutes', 'Calves',
+    'Core', 'Forearms', 'Traps', 'Lats'
+]
+
+
+@dataclass(frozen=True)
+class MuscleMatrix:
+    """Exercise x muscle weight matrix built from the exercise catalog"""
+    etag: str
+    exercise_index: Dict[UUID, int]
+    muscles: List[str]
+    weights: np.ndarray
+
+
+_matrix: Optional[MuscleMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def build_matrix(exercises: List[Dict[str, Any]], etag: str = "") -> MuscleMatrix:
+    """Build the weight matrix; primary muscles weigh 1.0 and sub muscles 0.5 per set.
+
+    Weights add up the way AnatomyHeatmap.vue adds them, so a muscle listed
+    as both primary and sub muscle of an exercise weighs 1.5.
+    """
+    muscles = sorted(set(HEATMAP_MUSCLES) | {
+        muscle
+        for exercise in exercises
+        for muscle in (exercise.get('muscles') or []) + (exercise.get('sub_muscles') or [])
+    })
+    muscle_index = {muscle: i for i, muscle in enumerate(muscles)}
+
+    weights = np.zeros((len(exercises), len(muscles)), dtype=np.float32)
+    exercise_index = {}
+    for row, exercise in enumerate(exercises):
+        exercise_index[UUID(str(exercise['item_id']))] = row
+        for muscle in exercise.get('muscles') or []:
+            weights[row, muscle_index[muscle]] += PRIMARY_MUSCLE_WEIGHT
+        for muscle in exercise.get('sub_muscles') or []:
+            weights[row, muscle_index[muscle]] += SUB_MUSCLE_WEIGHT
+
+    return MuscleMatrix(etag=etag, exercise_index=exercise_index, muscles=muscles, weights=weights)
+
+
+def get_matrix(session: Session) -> MuscleMatrix:
+    """Get the weight matrix for the current exercise catalog, rebuilding it when the catalog changes"""
+    global _matrix
+    catalog = exercises_models.get_catalog(session)
+    matrix = _matrix
+    if matrix is not None and matrix.etag == catalog.etag:
+        return matrix
+
+    with _matrix_lock:
+        if _matrix is None or _matrix.etag != catalog.etag:
+            exercises = json.loads(catalog.body)["exercises"]
+            _matrix = build_matrix(exercises, catalog.etag)
+        return _matrix
+
+
+def get_activation(
+    session: Session,
+    user_id: UUID,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+) -> Dict[str, Any]:
+    """Get weighted set counts per muscle for a user's sets in a date window.
+
+    Activation is normalized to the busiest muscle, but never divided by less
+    than one set, as in AnatomyHeatmap.vue.
+    """
+    matrix = get_matrix(session)
+
+    statement = (
+        select(WorkoutSetsDB.exercise_id, func.count(WorkoutSetsDB.item_id))
+        .where(WorkoutSetsDB.user_id == user_id)
+        .group_by(WorkoutSetsDB.exercise_id)
+    )
+    statement = workouts_models.filter_by_date(statement, date_from, date_to, WorkoutSetsDB.workout_date)
+
+    set_counts = np.zeros(len(matrix.exercise_index), dtype=np.float32)
+    for exercise_id, count in session.exec(statement).all():
+        row = matrix.exercise_index.get(exercise_id)
+        if row is not None:
+            set_counts[row] = count
+
+    weighted_sets = set_counts @ matrix.weights
+    peak = max(float(weighted_sets.max()) if weighted_sets.size else 0.0, 1.0)
+    activation = weighted_sets / peak
+
+    return {
+        'muscles': matrix.muscles,
+        'activation': [round(float(value), 4) for value in activation],
+        'weighted_sets': [float(value) for value in weighted_sets],
+    }
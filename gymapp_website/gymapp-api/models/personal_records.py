@@ -0,0 +1,294 @@
+from sqlmodel import Session, select, SQLModel, Field
+from sqlalchemy import delete
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from uuid import UUID
+
+from models import exercises as exercises_models
+from models.workout_sets import WorkoutSetsDB
+
+RECORD_METRICS = ("max_weight", "best_e1rm", "best_volume")
+
+
+class PersonalRecordsDB(SQLModel, table=True):
+    """Best lifts per user and exercise, with the workout that holds each record"""
+    __tablename__ = "personal_records"
+    user_id: UUID = Field(foreign_key="users.item_id", primary_key=True)
+    exercise_id: UUID = Field(primary_key=True)
+    max_weight: float = 0
+    max_weight_reps: int = 0
+    max_weight_workout_id: Optional[UUID] = None
+    max_weight_date: Optional[datetime] = None
+    best_e1rm: float = 0
+    best_e1rm_workout_id: Optional[UUID] = None
+    best_e1rm_date: Optional[datetime] = None
+    best_volume: float = 0
+    best_volume_workout_id: Optional[UUID] = None
+    best_volume_date: Optional[datetime] = None
+    item_modified: datetime = Field(default_factory=datetime.now)
+
+
+class PersonalRepRecordsDB(SQLModel, table=True):
+    """Most reps a user has done of an exercise at one weight, with the workout that holds it"""
+    __tablename__ = "personal_rep_records"
+    user_id: UUID = Field(foreign_key="users.item_id", primary_key=True)
+    exercise_id: UUID = Field(primary_key=True)
+    weight: float = Field(primary_key=True)
+    reps: int = 0
+    workout_id: Optional[UUID] = None
+    date: Optional[datetime] = None
+    item_modified: datetime = Field(default_factory=datetime.now)
+
+
+def estimate_1rm(weight: float, reps: int) -> float:
+    """Estimate a one-rep max with the Epley formula"""
+    if reps <= 0 or weight <= 0:
+        return 0.0
+    if reps == 1:
+        return weight
+    return weight * (1 + reps / 30)
+
+
+def summarize(rows: List[WorkoutSetsDB]) -> Dict[Tuple[UUID, UUID], PersonalRecordsDB]:
+    """Compute the records achieved by a list of set rows, keyed by (user_id, exercise_id)"""
+    records = {}
+    volumes = {}
+    for row in rows:
+        key = (row.user_id, row.exercise_id)
+        record = records.get(key)
+        if record is None:
+            record = records[key] = PersonalRecordsDB(user_id=row.user_id, exercise_id=row.exercise_id)
+
+        if (row.weight, row.reps) > (record.max_weight, record.max_weight_reps):
+            record.max_weight = row.weight
+            record.max_weight_reps = row.reps
+            record.max_weight_workout_id = row.workout_id
+            record.max_weight_date = row.workout_date
+
+        e1rm = estimate_1rm(row.weight, row.reps)
+        if e1rm > record.best_e1rm:
+            record.best_e1rm = e1rm
+            record.best_e1rm_workout_id = row.workout_id
+            record.best_e1rm_date = row.workout_date
+
+        session_key = key + (row.workout_id,)
+        volume, _ = volumes.get(session_key, (0.0, row.workout_date))
+        volumes[session_key] = (volume + row.weight * row.reps, row.workout_date)
+
+    for (user_id, exercise_id, workout_id), (volume, workout_date) in volumes.items():
+        record = records[(user_id, exercise_id)]
+        if volume > record.best_volume:
+            record.best_volume = volume
+            record.best_volume_workout_id = workout_id
+            record.best_volume_date = workout_date
+
+    return records
+
+
+def summarize_reps(rows: List[WorkoutSetsDB]) -> Dict[Tuple[UUID, UUID, float], PersonalRepRecordsDB]:
+    """Compute the most reps at each weight in a list of set rows, keyed by (user_id, exercise_id, weight)"""
+    records = {}
+    for row in rows:
+        if row.reps <= 0:
+            continue
+        key = (row.user_id, row.exercise_id, row.weight)
+        record = records.get(key)
+        if record is None or row.reps > record.reps:
+            records[key] = PersonalRepRecordsDB(
+                user_id=row.user_id, exercise_id=row.exercise_id, weight=row.weight,
+                reps=row.reps, workout_id=row.workout_id, date=row.workout_date
+            )
+    return records
+
+
+def copy_reps(record: PersonalRepRecordsDB, source: PersonalRepRecordsDB):
+    """Copy the reps, workout and date of a rep record"""
+    record.reps = source.reps
+    record.workout_id = source.workout_id
+    record.date = source.date
+    record.item_modified = datetime.now()
+
+
+def copy_metric(record: PersonalRecordsDB, source: PersonalRecordsDB, metric: str):
+    """Copy one metric, with the workout and date that hold it, between records"""
+    for suffix in ("", "_workout_id", "_date"):
+        setattr(record, metric + suffix, getattr(source, metric + suffix))
+    if metric == "max_weight":
+        record.max_weight_reps = source.max_weight_reps
+
+
+def merge(record: PersonalRecordsDB, candidate: PersonalRecordsDB) -> bool:
+    """Copy every metric where the candidate beats the record; returns whether anything changed"""
+    changed = False
+    if (candidate.max_weight, candidate.max_weight_reps) > (record.max_weight, record.max_weight_reps):
+        copy_metric(record, candidate, "max_weight")
+        changed = True
+    for metric in ("best_e1rm", "best_volume"):
+        if getattr(candidate, metric) > getattr(record, metric):
+            copy_metric(record, candidate, metric)
+            changed = True
+    return changed
+
+
+def holds_record(record: PersonalRecordsDB, workout_id: UUID) -> bool:
+    """Check whether a workout holds any metric of a record"""
+    return any(getattr(record, f"{metric}_workout_id") == workout_id for metric in RECORD_METRICS)
+
+
+def apply(
+    session: Session,
+    workout_id: Optional[UUID],
+    added: List[WorkoutSetsDB] = (),
+    removed: List[WorkoutSetsDB] = ()
+):
+    """Update records for a workout's new and removed sets in the caller's transaction.
+
+    New sets only ever improve a record. The records of an exercise where
+    this workout held any metric or any weight's rep record are recomputed
+    from the remaining workout_sets rows, so call this after the old set rows
+    have been deleted. Pass workout_id=None when every added row belongs to a
+    new workout, as in bulk ingest.
+    """
+    keys = {(row.user_id, row.exercise_id) for row in list(added) + list(removed)}
+    if not keys:
+        return
+
+    user_ids = {user_id for user_id, _ in keys}
+    exercise_ids = {exercise_id for _, exercise_id in keys}
+    existing = {
+        (record.user_id, record.exercise_id): record
+        for record in session.exec(
+            select(PersonalRecordsDB).where(
+                PersonalRecordsDB.user_id.in_(user_ids),
+                PersonalRecordsDB.exercise_id.in_(exercise_ids)
+            )
+        ).all()
+        if (record.user_id, record.exercise_id) in keys
+    }
+    existing_reps = {
+        (record.user_id, record.exercise_id, record.weight): record
+        for record in session.exec(
+            select(PersonalRepRecordsDB).where(
+                PersonalRepRecordsDB.user_id.in_(user_ids),
+                PersonalRepRecordsDB.exercise_id.in_(exercise_ids)
+            )
+        ).all()
+        if (record.user_id, record.exercise_id) in keys
+    }
+
+    stale = set()
+    if workout_id is not None:
+        stale = {key for key, record in existing.items() if holds_record(record, workout_id)}
+        stale |= {key[:2] for key, record in existing_reps.items() if record.workout_id == workout_id}
+    if stale:
+        recompute(session, stale, existing, existing_reps)
+
+    fresh_rows = [row for row in added if (row.user_id, row.exercise_id) not in stale]
+    for key, candidate in summarize(fresh_rows).items():
+        record = existing.get(key)
+        if record is None:
+            session.add(candidate)
+        elif merge(record, candidate):
+            record.item_modified = datetime.now()
+            session.add(record)
+    for key, candidate in summarize_reps(fresh_rows).items():
+        record = existing_reps.get(key)
+        if record is None:
+            session.add(candidate)
+        elif candidate.reps > record.reps:
+            copy_reps(record, candidate)
+            session.add(record)
+
+
+def recompute(
+    session: Session,
+    keys: set,
+    existing: Dict[Tuple[UUID, UUID], PersonalRecordsDB],
+    existing_reps: Dict[Tuple[UUID, UUID, float], PersonalRepRecordsDB]
+):
+    """Recompute records and rep records for (user_id, exercise_id) pairs from their stored sets"""
+    rows = session.exec(
+        select(WorkoutSetsDB).where(
+            WorkoutSetsDB.user_id.in_({user_id for user_id, _ in keys}),
+            WorkoutSetsDB.exercise_id.in_({exercise_id for _, exercise_id in keys})
+        )
+    ).all()
+    rows = [row for row in rows if (row.user_id, row.exercise_id) in keys]
+    fresh = summarize(rows)
+    fresh_reps = summarize_reps(rows)
+
+    for key in keys:
+        record = existing.get(key)
+        candidate = fresh.get(key)
+        if record is None:
+            if candidate is not None:
+                session.add(candidate)
+            continue
+        if candidate is None:
+            session.delete(record)
+            continue
+        for metric in RECORD_METRICS:
+            copy_metric(record, candidate, metric)
+        record.item_modified = datetime.now()
+        session.add(record)
+
+    for key, record in existing_reps.items():
+        if key[:2] not in keys:
+            continue
+        candidate = fresh_reps.pop(key, None)
+        if candidate is None:
+            session.delete(record)
+        else:
+            copy_reps(record, candidate)
+            session.add(record)
+    session.add_all(fresh_reps.values())
+
+
+def rebuild(session: Session, user_id: Optional[UUID] = None) -> int:
+    """Recompute personal records from workout_sets, for one user or everyone"""
+    statement = select(WorkoutSetsDB)
+    clear = delete(PersonalRecordsDB)
+    clear_reps = delete(PersonalRepRecordsDB)
+    if user_id is not None:
+        statement = statement.where(WorkoutSetsDB.user_id == user_id)
+        clear = clear.where(PersonalRecordsDB.user_id == user_id)
+        clear_reps = clear_reps.where(PersonalRepRecordsDB.user_id == user_id)
+
+    session.execute(clear)
+    session.execute(clear_reps)
+    rows = session.exec(statement).all()
+    records = summarize(rows)
+    session.add_all(records.values())
+    session.add_all(summarize_reps(rows).values())
+    session.commit()
+    print(f"Rebuilt {len(records)} personal records")
+    return len(records)
+
+
+def get_for_user(session: Session, user_id: UUID) -> List[Dict[str, Any]]:
+    """Get a user's personal records with exercise names and the most reps at each weight"""
+    records = session.exec(
+        select(PersonalRecordsDB).where(PersonalRecordsDB.user_id == user_id)
+    ).all()
+    exercises_by_id = exercises_models.get_by_ids(session, (record.exercise_id for record in records))
+    reps_by_exercise = {}
+    for rep_record in session.exec(
+        select(PersonalRepRecordsDB)
+        .where(PersonalRepRecordsDB.user_id == user_id)
+        .order_by(PersonalRepRecordsDB.weight)
+    ).all():
+        reps_by_exercise.setdefault(rep_record.exercise_id, []).append({
+            'weight': rep_record.weight,
+            'reps': rep_record.reps,
+            'workout_id': rep_record.workout_id,
+            'date': rep_record.date,
+        })
+
+    results = []
+    for record in records:
+        exercise = exercises_by_id.get(record.exercise_id)
+        record_dict = record.dict()
+        record_dict['exercise_name'] = exercise.name if exercise else None
+        record_dict['max_reps_at_weight'] = reps_by_exercise.get(record.exercise_id, [])
+        results.append(record_dict)
+    return sorted(results, key=lambda record: record['exercise_name'] or '')
@@ -1,9 +1,8 @@
 from sqlmodel import Session, select, SQLModel, Field, JSON, Column
 from typing import List
 from models.base import Base
-from models.exercises import ExercisesDB
-from models.users import UsersDB
 from models import exercises as exercises_models
+from models import users as users_models
 from typing import Optional, Dict, Any
 from datetime import datetime
 from uuid import UUID
@@ -24,69 +23,26 @@ class PlannedWorkoutsDB(Base, PlannedWorkoutsBase, table=True):
 
 class PlannedWorkoutsCreate(BaseModel):
     name: Optional[str] = None
-    workout_list: List[ExercisesDB] = Field(default_factory=list)
+    workout_list: List[Dict[str, Any]] = Field(default_factory=list)
     notes: Optional[str] = None
     user_id: UUID
 
 
 def create(session: Session, data: PlannedWorkoutsCreate) -> PlannedWorkoutsDB:
-    """Create a new workout"""
-    exercises = []
-    exercise_performances = []
-
-    for exercise_data in data.workout_list:
-        item_id = exercise_data.get('item_id')
-        exercise_details = exercise_data.get('exerciseDetails', {})
-        sets_data = exercise_data.get('sets', [])
-        
-        if not item_id:
-            new_exercise_data = exercises_models.ExercisesCreate(
-                name=exercise_data.get('name', exercise_details.get('name', '')),
-                description=exercise_details.get('description', ''),
-                category=exercise_details.get('category', 'Strength'),
-                equipment=exercise_details.get('equipment', 'None'),
-                muscles=exercise_details.get('muscles', []),
-                sub_muscles=exercise_details.get('sub_muscles', [])
-            )
-            new_exercise = exercises_models.create(session, new_exercise_data)
-            item_id = new_exercise.item_id
-        else:
-            db_exercise = session.exec(
-                select(ExercisesDB).where(ExercisesDB.item_id == UUID(str(item_id)))
-            ).first()
-            if not db_exercise:
-                new_exercise_data = exercises_models.ExercisesCreate(
-                    name=exercise_data.get('name', ''),
-                    description=exercise_data.get('description', ''),
-                    category=exercise_data.get('category', 'Strength'),
-                    equipment=exercise_data.get('equipment', 'None'),
-                    muscles=exercise_data.get('muscles', []),
-                    sub_muscles=exercise_data.get('sub_muscles', [])
-                )
-                new_exercise = exercises_models.create(session, new_exercise_data)
-                item_id = new_exercise.item_id
-        
-        exercises.append(item_id)
-        
-        performance_data = {
-            'exercise_id': str(item_id),
-            'sets': sets_data
-        }
-        exercise_performances.append(performance_data)
+    """Create a new planned workout and any new exercises in a single transaction"""
+    users_models.ensure_exists(session, data.user_id)
+    exercise_ids, upserted = exercises_models.resolve(session, data.workout_list)
 
     db_workout = PlannedWorkoutsDB(
         name=data.name,
         notes=data.notes,
-        exercises=exercises,
-        exercise_performances=exercise_performances,
+        exercises=[str(exercise_id) for exercise_id in exercise_ids],
+        exercise_performances=exercises_models.build_performances(exercise_ids, data.workout_list),
         user_id=data.user_id
-    ) 
-    user_exists = session.exec(
-        select(UsersDB).where(UsersDB.item_id == data.user_id)
-    ).first()
-    if not user_exists:
-        raise ValueError(f"User with ID {data.user_id} does not exist in the database.")
+    )
     session.add(db_workout)
     session.commit()
     session.refresh(db_workout)
-    return db_workout
\ No newline at end of file
+    if upserted:
+        exercises_models.invalidate_catalog()
+    return db_workout
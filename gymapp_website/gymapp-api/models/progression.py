@@ -0,0 +1,62 @@
+from sqlmodel import Session, select
+from typing import Dict, Any, Optional
+from uuid import UUID
+
+import numpy as np
+
+from models.workout_sets import WorkoutSetsDB
+from utils.downsample import lttb
+
+
+def get_progression(
+    session: Session,
+    user_id: UUID,
+    exercise_id: UUID,
+    points: Optional[int] = None
+) -> Dict[str, Any]:
+    """Get top-set weight, best e1RM and volume per session for one exercise.
+
+    With ``points`` the series is downsampled with LTTB on the e1RM curve, so
+    long histories keep their shape in a bounded number of points.
+    """
+    rows = session.exec(
+        select(WorkoutSetsDB.workout_id, WorkoutSetsDB.workout_date, WorkoutSetsDB.weight, WorkoutSetsDB.reps)
+        .where(WorkoutSetsDB.user_id == user_id, WorkoutSetsDB.exercise_id == exercise_id)
+        .order_by(WorkoutSetsDB.workout_date, WorkoutSetsDB.workout_id)
+    ).all()
+
+    result = {'exercise_id': str(exercise_id), 'total_sessions': 0, 'sessions': []}
+    if not rows:
+        return result
+
+    workout_ids = [row[0] for row in rows]
+    dates = [row[1] for row in rows]
+    weight = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    reps = np.fromiter((row[3] for row in rows), dtype=np.float64, count=len(rows))
+
+    e1rm = np.where(reps > 1, weight * (1 + reps / 30), weight)
+    e1rm[(reps <= 0) | (weight <= 0)] = 0
+
+    # rows are ordered by workout, so each session is a contiguous run
+    starts = np.flatnonzero([True] + [workout_ids[i] != workout_ids[i - 1] for i in range(1, len(rows))])
+    top_weight = np.maximum.reduceat(weight, starts)
+    best_e1rm = np.maximum.reduceat(e1rm, starts)
+    volume = np.add.reduceat(weight * reps, starts)
+
+    keep = np.arange(len(starts))
+    if points:
+        timestamps = np.array([dates[start].timestamp() for start in starts])
+        keep = lttb(timestamps, best_e1rm, points)
+
+    result['total_sessions'] = len(starts)
+    result['sessions'] = [
+        {
+            'workout_id': str(workout_ids[starts[i]]),
+            'date': dates[starts[i]],
+            'top_set_weight': float(top_weight[i]),
+            'e1rm': round(float(best_e1rm[i]), 2),
+            'volume': float(volume[i]),
+        }
+        for i in keep
+    ]
+    return result
@@ -0,0 +1,95 @@
+import os
+import hashlib
+from dataclasses import dataclass
+from sqlmodel import Session, select, SQLModel, Field
+from sqlalchemy import Index, func
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+
+# item_modified is stamped by the app before commit, so a row can become visible after a client
+# already holds a newer token; delta syncs re-read this far behind `since` to pick such rows up
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "60"))
+
+
+class TombstonesDB(SQLModel, table=True):
+    """Record of a deleted workout or planned workout, so delta syncs can drop it"""
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_user_kind_deleted", "user_id", "kind", "deleted_at"),
+    )
+    item_id: UUID = Field(primary_key=True)
+    user_id: UUID = Field(foreign_key="users.item_id", nullable=False)
+    kind: str
+    deleted_at: datetime = Field(default_factory=datetime.now)
+
+
+def record_deletion(session: Session, item_id: UUID, user_id: UUID, kind: str):
+    """Add a tombstone for a deleted item in the caller's transaction"""
+    session.merge(TombstonesDB(item_id=item_id, user_id=user_id, kind=kind, deleted_at=datetime.now()))
+
+
+@dataclass(frozen=True)
+class SyncState:
+    """Version of a user's rows in one table: row count, latest change and latest deletion"""
+    kind: str
+    user_id: UUID
+    count: int
+    last_modified: Optional[datetime]
+    last_deleted: Optional[datetime]
+
+    def etag(self, variant: str = "") -> str:
+        """Get an ETag for this state; `variant` separates differently filtered responses"""
+        version = f"{self.kind}|{self.user_id}|{self.count}|{self.last_modified}|{self.last_deleted}|{variant}"
+        return f'"{hashlib.sha1(version.encode()).hexdigest()}"'
+
+    @property
+    def sync_token(self) -> Optional[datetime]:
+        """Newest change covered by this state, to pass as `since` on the next sync"""
+        changes = [value for value in (self.last_modified, self.last_deleted) if value is not None]
+        return max(changes) if changes else None
+
+
+def get_state(session: Session, model, user_id: UUID, kind: str) -> SyncState:
+    """Get the sync state of a user's rows in a table with two aggregate queries"""
+    count, last_modified = session.exec(
+        select(func.count(model.item_id), func.max(model.item_modified)).where(model.user_id == user_id)
+    ).one()
+    last_deleted = session.exec(
+        select(func.max(TombstonesDB.deleted_at)).where(
+            TombstonesDB.user_id == user_id, TombstonesDB.kind == kind
+        )
+    ).one()
+    return SyncState(kind=kind, user_id=user_id, count=count, last_modified=last_modified, last_deleted=last_deleted)
+
+
+def get_changes(session: Session, model, user_id: UUID, kind: str, since: datetime) -> Dict[str, Any]:
+    """Get a user's rows created or modified after `since`, plus ids deleted after it.
+
+    `sync_token` is the newest change returned; pass it back as `since` on the
+    next call. Rows and deletions up to SYNC_OVERLAP_SECONDS older than `since`
+    are returned again, so a change that committed late is not skipped; clients
+    merge by item_id, so the repeats are harmless.
+    """
+    window_start = since - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+    items = session.exec(
+        select(model)
+        .where(model.user_id == user_id, model.item_modified > window_start)
+        .order_by(model.item_modified)
+    ).all()
+    tombstones = session.exec(
+        select(TombstonesDB).where(
+            TombstonesDB.user_id == user_id,
+            TombstonesDB.kind == kind,
+            TombstonesDB.deleted_at > window_start
+        )
+    ).all()
+
+    sync_token = max(
+        [since] + [item.item_modified for item in items] + [tombstone.deleted_at for tombstone in tombstones]
+    )
+    return {
+        "items": items,
+        "deleted": [str(tombstone.item_id) for tombstone in tombstones],
+        "sync_token": sync_token,
+    }
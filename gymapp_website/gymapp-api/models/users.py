@@ -1,9 +1,10 @@
 from sqlmodel import Session, select, SQLModel, Field, JSON, Column
-from typing import List
+from typing import List, Dict
+from sqlalchemy import update as sql_update, values, column, Uuid, DateTime
 from models.base import Base
 from typing import Optional
 from datetime import datetime
-from utils.auth import hash_password, verify_password
+from utils.auth import hash_password
 from uuid import UUID
 from pydantic import BaseModel
 
@@ -55,12 +56,19 @@ class UsersResponse(UsersBase):
     item_modified: datetime
 
 
-def create(session: Session, data: UsersCreate) -> UsersDB:
-    """Create a new user with hashed password"""
+def ensure_exists(session: Session, user_id: UUID):
+    """Raise ValueError unless a user with this id exists"""
+    user_exists = session.exec(select(UsersDB.item_id).where(UsersDB.item_id == user_id)).first()
+    if not user_exists:
+        raise ValueError(f"User with ID {user_id} does not exist in the database.")
+
+
+def create(session: Session, data: UsersCreate, hashed_password: Optional[str] = None) -> UsersDB:
+    """Create a new user with hashed password (hashed here unless the caller already did)"""
     user_data = data.dict()
     password = user_data.pop('password')
     
-    db_user = UsersDB(**user_data, hashed_password=hash_password(password))
+    db_user = UsersDB(**user_data, hashed_password=hashed_password or hash_password(password))
     db_user.create()
     
     session.add(db_user)
@@ -69,8 +77,13 @@ def create(session: Session, data: UsersCreate) -> UsersDB:
     return db_user
 
 
-def update(session: Session, item_id: str, data: UsersUpdate) -> tuple[UsersDB, bool]:
-    """Update an existing user"""
+def update(
+    session: Session,
+    item_id: str,
+    data: UsersUpdate,
+    hashed_password: Optional[str] = None
+) -> tuple[UsersDB, bool]:
+    """Update an existing user (a new password is hashed here unless the caller already did)"""
     statement = select(UsersDB).where(UsersDB.item_id == item_id)
     db_user = session.exec(statement).first()
     
@@ -81,7 +94,7 @@ def update(session: Session, item_id: str, data: UsersUpdate) -> tuple[UsersDB,
     
     if 'password' in update_data:
         password = update_data.pop('password')
-        db_user.hashed_password = hash_password(password)
+        db_user.hashed_password = hashed_password or hash_password(password)
     
     updated = False
     for field, value in update_data.items():
@@ -99,17 +112,33 @@ def update(session: Session, item_id: str, data: UsersUpdate) -> tuple[UsersDB,
     return db_user, updated
 
 
-def authenticate(session: Session, username: str, password: str) -> Optional[UsersDB]:
-    """Authenticate a user by username and password"""
-    statement = select(UsersDB).where(UsersDB.username == username)
-    user = session.exec(statement).first()
-    
-    if not user or not verify_password(password, user.hashed_password):
-        return None
-    
-    user.last_use = datetime.now()
+def store_rehash(session: Session, user: UsersDB, new_hash: str) -> UsersDB:
+    """Store a password rehashed at the current bcrypt cost after a verified login"""
+    user.hashed_password = new_hash
     user.update()
     session.add(user)
     session.commit()
     
-    return user
\ No newline at end of file
+    return user
+
+
+def record_activity(session: Session, last_seen: Dict[UUID, datetime]) -> int:
+    """Write buffered last-seen times for many users in one UPDATE ... FROM (VALUES ...)"""
+    if not last_seen:
+        return 0
+    
+    seen = values(
+        column('item_id', Uuid),
+        column('last_use', DateTime),
+        name='seen'
+    ).data(list(last_seen.items()))
+    
+    statement = (
+        sql_update(UsersDB)
+        .where(UsersDB.item_id == seen.c.item_id)
+        .values(last_use=seen.c.last_use, item_modified=seen.c.last_use)
+    )
+    result = session.execute(statement, execution_options={'synchronize_session': False})
+    session.commit()
+    
+    return result.rowcount
@@ -0,0 +1,148 @@
+from sqlmodel import Session, select, SQLModel, Field
+from sqlalchemy import delete, tuple_
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
+from uuid import UUID
+
+from models import exercises as exercises_models
+from models.workout_sets import WorkoutSetsDB
+
+
+class WeeklyRollupsDB(SQLModel, table=True):
+    """Training totals per user, ISO week and primary muscle group"""
+    __tablename__ = "weekly_rollups"
+    user_id: UUID = Field(foreign_key="users.item_id", primary_key=True)
+    week_start: date = Field(primary_key=True)
+    muscle: str = Field(primary_key=True)
+    set_count: int = 0
+    rep_count: int = 0
+    tonnage: float = 0
+
+
+def week_start(value: datetime) -> date:
+    """Get the Monday that starts the ISO week of a date"""
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def accumulate(
+    rows: List[WorkoutSetsDB],
+    exercises_by_id: Dict[UUID, Any],
+    sign: int = 1,
+    totals: Optional[Dict[Tuple[UUID, date, str], List[float]]] = None
+) -> Dict[Tuple[UUID, date, str], List[float]]:
+    """Sum set rows into (user, week, muscle) -> [sets, reps, tonnage]; each set counts once per primary muscle"""
+    if totals is None:
+        totals = {}
+    for row in rows:
+        exercise = exercises_by_id.get(row.exercise_id)
+        if not exercise:
+            continue
+        week = week_start(row.workout_date)
+        for muscle in exercise.muscles or []:
+            entry = totals.setdefault((row.user_id, week, muscle), [0, 0, 0.0])
+            entry[0] += sign
+            entry[1] += sign * row.reps
+            entry[2] += sign * row.weight * row.reps
+    return totals
+
+
+def apply(session: Session, added: List[WorkoutSetsDB] = (), removed: List[WorkoutSetsDB] = ()):
+    """Add new set rows to and subtract old set rows from the rollups in the caller's transaction.
+
+    Every touched (user, week, muscle) rollup is loaded with one query.
+    """
+    if not added and not removed:
+        return
+    exercises_by_id = exercises_models.get_by_ids(
+        session, [row.exercise_id for row in added] + [row.exercise_id for row in removed]
+    )
+    totals = accumulate(added, exercises_by_id, 1)
+    accumulate(removed, exercises_by_id, -1, totals)
+
+    totals = {key: change for key, change in totals.items() if any(change)}
+    if not totals:
+        return
+    existing = {
+        (rollup.user_id, rollup.week_start, rollup.muscle): rollup
+        for rollup in session.exec(
+            select(WeeklyRollupsDB).where(
+                tuple_(WeeklyRollupsDB.user_id, WeeklyRollupsDB.week_start, WeeklyRollupsDB.muscle).in_(list(totals))
+            )
+        ).all()
+    }
+
+    for key, (sets, reps, tonnage) in totals.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            user_id, week, muscle = key
+            rollup = WeeklyRollupsDB(user_id=user_id, week_start=week, muscle=muscle)
+        rollup.set_count += sets
+        rollup.rep_count += reps
+        rollup.tonnage += tonnage
+        if rollup.set_count > 0:
+            session.add(rollup)
+        elif rollup in session:
+            session.delete(rollup)
+
+
+def rebuild(session: Session, user_id: Optional[UUID] = None) -> int:
+    """Recompute rollups from workout_sets, for one user or everyone"""
+    statement = select(WorkoutSetsDB)
+    clear = delete(WeeklyRollupsDB)
+    if user_id is not None:
+        statement = statement.where(WorkoutSetsDB.user_id == user_id)
+        clear = clear.where(WeeklyRollupsDB.user_id == user_id)
+
+    session.execute(clear)
+    exercises_by_id = {exercise.item_id: exercise for exercise in session.exec(select(exercises_models.ExercisesDB)).all()}
+    totals = {}
+    for row in session.exec(statement.execution_options(yield_per=5000)):
+        accumulate([row], exercises_by_id, totals=totals)
+
+    for (row_user_id, week, muscle), (sets, reps, tonnage) in totals.items():
+        session.add(WeeklyRollupsDB(
+            user_id=row_user_id,
+            week_start=week,
+            muscle=muscle,
+            set_count=sets,
+            rep_count=reps,
+            tonnage=tonnage
+        ))
+    session.commit()
+    print(f"Rebuilt {len(totals)} weekly rollups")
+    return len(totals)
+
+
+def get_for_user(
+    session: Session,
+    user_id: UUID,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    period: str = "week"
+) -> List[Dict[str, Any]]:
+    """Get a user's rollups per week, or per month (weeks grouped by the month their Monday falls in)"""
+    statement = select(WeeklyRollupsDB).where(WeeklyRollupsDB.user_id == user_id)
+    if date_from:
+        statement = statement.where(WeeklyRollupsDB.week_start >= week_start(date_from))
+    if date_to:
+        statement = statement.where(WeeklyRollupsDB.week_start <= date_to)
+    statement = statement.order_by(WeeklyRollupsDB.week_start, WeeklyRollupsDB.muscle)
+
+    periods = {}
+    for rollup in session.exec(statement).all():
+        if period == "month":
+            start = rollup.week_start.replace(day=1)
+        else:
+            start = rollup.week_start
+        entry = periods.setdefault((start, rollup.muscle), {
+            'period_start': start.isoformat(),
+            'muscle': rollup.muscle,
+            'set_count': 0,
+            'rep_count': 0,
+            'tonnage': 0.0,
+        })
+        entry['set_count'] += rollup.set_count
+        entry['rep_count'] += rollup.rep_count
+        entry['tonnage'] += rollup.tonnage
+    return list(periods.values())
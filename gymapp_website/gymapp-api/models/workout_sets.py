@@ -0,0 +1,74 @@
+from sqlmodel import Session, select, SQLModel, Field
+from sqlalchemy import Index, delete
+from typing import List, Any
+from models.base import Base
+from datetime import datetime
+from uuid import UUID
+
+
+class WorkoutSetsBase(SQLModel):
+    workout_id: UUID = Field(foreign_key="workouts.item_id", nullable=False, index=True)
+    user_id: UUID = Field(foreign_key="users.item_id", nullable=False)
+    exercise_id: UUID = Field(nullable=False)
+    workout_date: datetime
+    exercise_index: int
+    set_index: int
+    weight: float = 0
+    reps: int = 0
+
+
+class WorkoutSetsDB(Base, WorkoutSetsBase, table=True):
+    """One performed set, typed copy of a WorkoutsDB.exercise_performances entry"""
+    __tablename__ = "workout_sets"
+    __table_args__ = (
+        Index("ix_workout_sets_user_exercise_date", "user_id", "exercise_id", "workout_date"),
+        Index("ix_workout_sets_user_date", "user_id", "workout_date"),
+    )
+
+
+def parse_number(value: Any) -> float:
+    """Parse a weight/reps value as entered in the UI ("44", 44, "" or None)"""
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build(workout) -> List[WorkoutSetsDB]:
+    """Build the set rows for a workout from its exercise_performances"""
+    rows = []
+    for exercise_index, performance in enumerate(workout.exercise_performances or []):
+        exercise_id = performance.get('exercise_id')
+        if not exercise_id:
+            continue
+        for set_index, set_data in enumerate(performance.get('sets', [])):
+            rows.append(WorkoutSetsDB(
+                workout_id=workout.item_id,
+                user_id=workout.user_id,
+                exercise_id=UUID(str(exercise_id)),
+                workout_date=workout.date,
+                exercise_index=exercise_index,
+                set_index=set_index,
+                weight=parse_number(set_data.get('weight')),
+                reps=int(parse_number(set_data.get('reps')))
+            ))
+    return rows
+
+
+def get_for_workout(session: Session, workout_id: UUID) -> List[WorkoutSetsDB]:
+    """Get the set rows of a workout"""
+    return session.exec(select(WorkoutSetsDB).where(WorkoutSetsDB.workout_id == workout_id)).all()
+
+
+def delete_for_workout(session: Session, workout_id: UUID):
+    """Delete the set rows of a workout (caller commits)"""
+    session.execute(delete(WorkoutSetsDB).where(WorkoutSetsDB.workout_id == workout_id))
+
+
+def replace_for_workout(session: Session, workout) -> List[WorkoutSetsDB]:
+    """Rewrite the set rows of a workout in the caller's transaction (caller commits)"""
+    delete_for_workout(session, workout.item_id)
+    rows = build(workout)
+    session.add_all(rows)
+    return rows
+
@@ -1,12 +1,20 @@
+import base64
 from sqlmodel import Session, select, SQLModel, Field, JSON, Column
-from typing import List, Dict, Any, Optional
+from sqlalchemy import Index, text, tuple_, func
+from typing import List, Dict, Any, Optional, Tuple
 from models.base import Base
-from models.exercises import ExercisesDB
 from models.users import UsersDB
 from models import exercises as exercises_models
-from datetime import datetime
+from models import users as users_models
+from models import workout_sets as workout_sets_models
+from models import weekly_rollups as weekly_rollups_models
+from models import personal_records as personal_records_models
+from models import sync as sync_models
+from datetime import datetime, timedelta, date as date_type
 from uuid import UUID
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+
+MAX_BULK_WORKOUTS = 500
 
 
 class ExercisePerformance(BaseModel):
@@ -28,6 +36,9 @@ class WorkoutsBase(SQLModel):
 
 class WorkoutsDB(Base, WorkoutsBase, table=True):
     __tablename__ = "workouts"
+    __table_args__ = (
+        Index("ix_workouts_user_id_date", "user_id", text("date DESC"), text("item_id DESC")),
+    )
     user_id: UUID = Field(foreign_key="users.item_id", nullable=False)
 
 
@@ -43,80 +54,182 @@ class WorkoutsCreate(BaseModel):
 
 
 def create(session: Session, data: WorkoutsCreate) -> WorkoutsDB:
-    """Create a new workout"""
-    exercises = []
-    exercise_performances = []
-    
-    for exercise_data in data.workout_list:
-        item_id = exercise_data.get('item_id')
-        exercise_details = exercise_data.get('exerciseDetails', {})
-        sets_data = exercise_data.get('sets', [])
-        
-        if not item_id:
-            new_exercise_data = exercises_models.ExercisesCreate(
-                name=exercise_data.get('name', exercise_details.get('name', '')),
-                description=exercise_details.get('description', ''),
-                category=exercise_details.get('category', 'Strength'),
-                equipment=exercise_details.get('equipment', 'None'),
-                muscles=exercise_details.get('muscles', []),
-                sub_muscles=exercise_details.get('sub_muscles', [])
-            )
-            new_exercise = exercises_models.create(session, new_exercise_data)
-            item_id = new_exercise.item_id
-        else:
-            db_exercise = session.exec(
-                select(ExercisesDB).where(ExercisesDB.item_id == UUID(str(item_id)))
-            ).first()
-            if not db_exercise:
-                new_exercise_data = exercises_models.ExercisesCreate(
-                    name=exercise_data.get('name', ''),
-                    description=exercise_data.get('description', ''),
-                    category=exercise_data.get('category', 'Strength'),
-                    equipment=exercise_data.get('equipment', 'None'),
-                    muscles=exercise_data.get('muscles', []),
-                    sub_muscles=exercise_data.get('sub_muscles', [])
-                )
-                new_exercise = exercises_models.create(session, new_exercise_data)
-                item_id = new_exercise.item_id
-        
-        exercises.append(item_id)
-        
-        performance_data = {
-            'exercise_id': str(item_id),
-            'sets': sets_data
-        }
-        exercise_performances.append(performance_data)
-    
+    """Create a new workout, its set rows and any new exercises in a single transaction"""
+    users_models.ensure_exists(session, data.user_id)
+    exercise_ids, upserted = exercises_models.resolve(session, data.workout_list)
+    db_workout = build(data, exercise_ids)
+
+    session.add(db_workout)
+    sets = workout_sets_models.build(db_workout)
+    session.add_all(sets)
+    weekly_rollups_models.apply(session, added=sets)
+    personal_records_models.apply(session, db_workout.item_id, added=sets)
+    session.commit()
+    session.refresh(db_workout)
+    if upserted:
+        exercises_models.invalidate_catalog()
+    return db_workout
+
+
+def build(data: WorkoutsCreate, exercise_ids: List[UUID]) -> WorkoutsDB:
+    """Build a workout row from a create payload and its resolved exercise ids"""
     if data.start_time and data.end_time:
         data.duration = int((data.end_time - data.start_time).total_seconds() / 60)
     elif data.start_time:
         data.end_time = datetime.now()
         data.duration = int((data.end_time - data.start_time).total_seconds() / 60)
-    
-    db_workout = WorkoutsDB(
+
+    return WorkoutsDB(
         name=data.name,
         date=data.date,
         start_time=data.start_time,
         end_time=data.end_time,
         duration=data.duration,
         notes=data.notes,
-        exercises=exercises,
-        exercise_performances=exercise_performances,
+        exercises=[str(exercise_id) for exercise_id in exercise_ids],
+        exercise_performances=exercises_models.build_performances(exercise_ids, data.workout_list),
         user_id=data.user_id
     )
+
+
+def create_many(session: Session, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Create many workouts in one transaction, returning a result per item.
+
+    Items that fail validation, reference an unknown user or carry malformed
+    exercise entries are reported and skipped before anything is written.
+    Exercises for the rest are resolved with one upsert, and every workout and
+    set row is inserted in one batched flush. Only if that flush fails are the
+    items retried one SAVEPOINT each, so one bad item cannot fail the others.
+    Rollups and records are applied once before a single commit.
+    """
+    results = [None] * len(items)
+
+    def fail(index: int, error: str):
+        results[index] = {'index': index, 'status': 'error', 'error': error}
+
+    payloads = []
+    for index, item in enumerate(items):
+        try:
+            payloads.append((index, WorkoutsCreate(**item)))
+        except (ValidationError, TypeError) as e:
+            fail(index, str(e))
+
+    user_ids = {data.user_id for _, data in payloads}
+    existing_users = set()
+    if user_ids:
+        existing_users = set(session.exec(select(UsersDB.item_id).where(UsersDB.item_id.in_(user_ids))).all())
+
+    valid = []
+    for index, data in payloads:
+        if data.user_id not in existing_users:
+            fail(index, f"User with ID {data.user_id} does not exist in the database.")
+            continue
+        try:
+            for entry in data.workout_list:
+                if entry.get('item_id'):
+                    UUID(str(entry['item_id']))
+                exercises_models.create_data_for(entry)
+        except (ValueError, TypeError) as e:
+            fail(index, f"Invalid exercise entry: {str(e)}")
+            continue
+        valid.append((index, data))
+
+    if not valid:
+        return results
+
+    try:
+        exercise_ids, upserted = exercises_models.resolve(
+            session, [exercise_data for _, data in valid for exercise_data in data.workout_list]
+        )
+    except Exception as e:
+        session.rollback()
+        print(f"Error resolving exercises for bulk workouts: {str(e)}")
+        for index, _ in valid:
+            fail(index, "Failed to resolve exercises")
+        return results
+
+    built = []
+    offset = 0
+    for index, data in valid:
+        count = len(data.workout_list)
+        item_exercise_ids = exercise_ids[offset:offset + count]
+        offset += count
+        try:
+            db_workout = build(data, item_exercise_ids)
+            built.append((index, db_workout, workout_sets_models.build(db_workout)))
+        except Exception as e:
+            print(f"Error building bulk workout {index}: {str(e)}")
+            fail(index, "Failed to create workout")
+
+    try:
+        with session.begin_nested():
+            for _, db_workout, rows in built:
+                session.add(db_workout)
+                session.add_all(rows)
+    except Exception as e:
+        print(f"Batch insert of bulk workouts failed, retrying one at a time: {str(e)}")
+        retried = []
+        for index, db_workout, rows in built:
+            try:
+                with session.begin_nested():
+                    session.add(db_workout)
+                    session.add_all(rows)
+            except Exception as e:
+                print(f"Error creating bulk workout {index}: {str(e)}")
+                fail(index, "Failed to create workout")
+                continue
+            retried.append((index, db_workout, rows))
+        built = retried
+
+    workouts = [(index, db_workout) for index, db_workout, _ in built]
+    sets = [row for _, _, rows in built for row in rows]
+    try:
+        weekly_rollups_models.apply(session, added=sets)
+        personal_records_models.apply(session, None, added=sets)
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        print(f"Error creating workouts in bulk: {str(e)}")
+        for index, _ in workouts:
+            fail(index, "Failed to create workout")
+        return results
+
+    if upserted:
+        exercises_models.invalidate_catalog()
+    for index, db_workout in workouts:
+        results[index] = {'index': index, 'status': 'created', 'item_id': db_workout.item_id}
+
+    return results
+
+
+def update(session: Session, db_workout: WorkoutsDB, data: WorkoutsBase) -> WorkoutsDB:
+    """Update an existing workout, its set rows and the rollups and records they feed"""
+    for field, value in data.dict(exclude_unset=True).items():
+        setattr(db_workout, field, value)
     
-    user_exists = session.exec(
-        select(UsersDB).where(UsersDB.item_id == data.user_id)
-    ).first()
-    if not user_exists:
-        raise ValueError(f"User with ID {data.user_id} does not exist in the database.")
+    db_workout.update()
     
+    old_sets = workout_sets_models.get_for_workout(session, db_workout.item_id)
     session.add(db_workout)
+    new_sets = workout_sets_models.replace_for_workout(session, db_workout)
+    weekly_rollups_models.apply(session, added=new_sets, removed=old_sets)
+    personal_records_models.apply(session, db_workout.item_id, added=new_sets, removed=old_sets)
     session.commit()
     session.refresh(db_workout)
     return db_workout
 
 
+def delete(session: Session, db_workout: WorkoutsDB):
+    """Delete a workout, its set rows and their share of the rollups and records, leaving a tombstone"""
+    old_sets = workout_sets_models.get_for_workout(session, db_workout.item_id)
+    weekly_rollups_models.apply(session, removed=old_sets)
+    workout_sets_models.delete_for_workout(session, db_workout.item_id)
+    personal_records_models.apply(session, db_workout.item_id, removed=old_sets)
+    sync_models.record_deletion(session, db_workout.item_id, db_workout.user_id, "workout")
+    session.delete(db_workout)
+    session.commit()
+
+
 def get_workout_with_details(session: Session, workout_id: UUID) -> Dict[str, Any]:
     """Get workout with exercise details and performance data"""
     workout = session.get(WorkoutsDB, workout_id)
@@ -124,16 +237,160 @@ def get_workout_with_details(session: Session, workout_id: UUID) -> Dict[str, An
         return None
     
     workout_dict = workout.dict()
-    detailed_exercises = []
-    
-    for i, exercise_id in enumerate(workout.exercises):
-        exercise = session.get(ExercisesDB, exercise_id)
-        if exercise:
-            exercise_data = exercise.dict()
-            if i < len(workout.exercise_performances):
-                performance = workout.exercise_performances[i]
-                exercise_data['sets'] = performance.get('sets', [])
-            detailed_exercises.append(exercise_data)
-    
-    workout_dict['detailed_exercises'] = detailed_exercises
-    return workout_dict
\ No newline at end of file
+    workout_dict['detailed_exercises'] = exercises_models.hydrate(session, [workout])[0]
+    return workout_dict
+
+
+def get_recent_with_details(session: Session, user_id: UUID, limit: int) -> List[Dict[str, Any]]:
+    """Get a user's latest workouts, newest first, each with its detailed exercises"""
+    workouts = session.exec(
+        select(WorkoutsDB)
+        .where(WorkoutsDB.user_id == user_id)
+        .order_by(WorkoutsDB.date.desc(), WorkoutsDB.item_id.desc())
+        .limit(limit)
+    ).all()
+
+    results = []
+    for workout, details in zip(workouts, exercises_models.hydrate(session, workouts)):
+        workout_dict = workout.dict()
+        workout_dict['detailed_exercises'] = details
+        results.append(workout_dict)
+    return results
+
+
+def filter_by_date(statement, date_from: Optional[date_type] = None, date_to: Optional[date_type] = None, column=None):
+    """Restrict a workouts query (or another date column) to an inclusive range of calendar days"""
+    if column is None:
+        column = WorkoutsDB.date
+    if date_from:
+        statement = statement.where(column >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        statement = statement.where(column < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return statement
+
+
+def encode_cursor(workout: WorkoutsDB, direction: str) -> str:
+    """Encode a workout's (date, item_id) position as an opaque page cursor"""
+    raw = f"{direction}|{workout.date.isoformat()}|{workout.item_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, datetime, UUID]:
+    """Decode a page cursor into its direction and (date, item_id) position"""
+    try:
+        direction, date_str, item_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if direction not in ("next", "prev"):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(date_str), UUID(item_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def get_page(
+    session: Session,
+    user_id: UUID,
+    limit: int,
+    cursor: Optional[str] = None,
+    date_from: Optional[date_type] = None,
+    date_to: Optional[date_type] = None
+) -> Dict[str, Any]:
+    """Get one page of a user's workouts, newest first, using keyset pagination on (date, item_id)"""
+    statement = filter_by_date(select(WorkoutsDB).where(WorkoutsDB.user_id == user_id), date_from, date_to)
+    position = tuple_(WorkoutsDB.date, WorkoutsDB.item_id)
+
+    direction = "next"
+    if cursor:
+        direction, cursor_date, cursor_id = decode_cursor(cursor)
+        if direction == "next":
+            statement = statement.where(position < tuple_(cursor_date, cursor_id))
+        else:
+            statement = statement.where(position > tuple_(cursor_date, cursor_id))
+
+    if direction == "next":
+        statement = statement.order_by(WorkoutsDB.date.desc(), WorkoutsDB.item_id.desc())
+    else:
+        statement = statement.order_by(WorkoutsDB.date.asc(), WorkoutsDB.item_id.asc())
+
+    workouts = list(session.exec(statement.limit(limit + 1)).all())
+    has_more = len(workouts) > limit
+    workouts = workouts[:limit]
+
+    if direction == "prev":
+        workouts.reverse()
+        has_next, has_prev = True, has_more
+    else:
+        has_next, has_prev = has_more, cursor is not None
+
+    return {
+        "workouts": workouts,
+        "next_cursor": encode_cursor(workouts[-1], "next") if workouts and has_next else None,
+        "prev_cursor": encode_cursor(workouts[0], "prev") if workouts and has_prev else None,
+    }
+
+
+def get_summaries(
+    session: Session,
+    user_id: Optional[UUID] = None,
+    workout_ids: Optional[List[UUID]] = None,
+    date_from: Optional[date_type] = None,
+    date_to: Optional[date_type] = None
+) -> List[Dict[str, Any]]:
+    """Get set/rep/volume totals per workout with a single aggregate query over workout_sets.
+
+    total_exercises counts the workout's exercise list, like the details
+    endpoint, so exercises logged without sets are still counted. The user,
+    id and date filters are applied inside the grouped subquery too, since
+    Postgres does not push them through the GROUP BY.
+    """
+    WorkoutSetsDB = workout_sets_models.WorkoutSetsDB
+    set_totals = (
+        select(
+            WorkoutSetsDB.workout_id,
+            func.count(WorkoutSetsDB.item_id).label('sets'),
+            func.sum(WorkoutSetsDB.reps).label('reps'),
+            func.sum(WorkoutSetsDB.weight).label('weight'),
+            func.sum(WorkoutSetsDB.weight * WorkoutSetsDB.reps).label('volume'),
+        )
+        .group_by(WorkoutSetsDB.workout_id)
+    )
+    if user_id is not None:
+        set_totals = set_totals.where(WorkoutSetsDB.user_id == user_id)
+    if workout_ids is not None:
+        set_totals = set_totals.where(WorkoutSetsDB.workout_id.in_(workout_ids))
+    set_totals = filter_by_date(set_totals, date_from, date_to, column=WorkoutSetsDB.workout_date).subquery()
+    statement = (
+        select(
+            WorkoutsDB.item_id,
+            WorkoutsDB.name,
+            WorkoutsDB.date,
+            WorkoutsDB.duration,
+            WorkoutsDB.exercises,
+            func.coalesce(set_totals.c.sets, 0),
+            func.coalesce(set_totals.c.reps, 0),
+            func.coalesce(set_totals.c.weight, 0),
+            func.coalesce(set_totals.c.volume, 0),
+        )
+        .select_from(WorkoutsDB)
+        .outerjoin(set_totals, set_totals.c.workout_id == WorkoutsDB.item_id)
+        .order_by(WorkoutsDB.date.desc(), WorkoutsDB.item_id.desc())
+    )
+    if user_id is not None:
+        statement = statement.where(WorkoutsDB.user_id == user_id)
+    if workout_ids is not None:
+        statement = statement.where(WorkoutsDB.item_id.in_(workout_ids))
+    statement = filter_by_date(statement, date_from, date_to)
+
+    summaries = []
+    for item_id, name, date, duration, exercises, sets, reps, weight, volume in session.exec(statement).all():
+        summaries.append({
+            'workout_id': str(item_id),
+            'name': name,
+            'date': date,
+            'duration': duration,
+            'total_exercises': len(exercises or []),
+            'total_sets': sets,
+            'total_reps': float(reps),
+            'total_weight': float(weight),
+            'total_volume': float(volume),
+        })
+    return summaries
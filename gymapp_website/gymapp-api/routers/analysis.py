@@ -1,16 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session
-from typing import List, Dict, Any, Optional
-from datetime import datetime, timedelta
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Dict, Any, Optional, Tuple
+from uuid import UUID
+from datetime import datetime, timedelta, time
 from pydantic import BaseModel
 import os
-from anthropic import Anthropic
+import hashlib
+from anthropic import AsyncAnthropic
 import json
 from dotenv import load_dotenv
 
-from utils.db import get_session
+from utils.db import get_async_session, async_session_maker
+from utils.cache import TTLCache
+from utils.responses import ClosingStreamingResponse
+from utils.admission import AdmissionGate, Overloaded
+from utils.workout_context import build_workout_context
 from models.users import UsersDB
-from models.workouts import WorkoutsDB
+from models import workouts as workouts_models
+from models import analysis_cache as analysis_cache_models
+from models import analysis_usage as analysis_usage_models
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
@@ -25,47 +34,34 @@ MODEL_CONFIG = {
     "temperature": float(os.getenv("CLAUDE_TEMPERATURE", "0.7")),
 }
 
-anthropic_client = Anthropic(api_key=api_key)
+ANALYSIS_WORKOUT_LIMIT = int(os.getenv("ANALYSIS_WORKOUT_LIMIT", "365"))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "256"))
+ANALYSIS_CACHE_TTL = int(os.getenv("ANALYSIS_CACHE_TTL", "86400"))
+ANALYSIS_CACHE_DB = os.getenv("ANALYSIS_CACHE_DB", "false").lower() in ("1", "true", "yes")
+
+ANALYSIS_DAILY_LIMIT = int(os.getenv("ANALYSIS_DAILY_LIMIT", "5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "16"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "20"))
+
+analysis_cache = TTLCache(ANALYSIS_CACHE_SIZE, ANALYSIS_CACHE_TTL)
+llm_gate = AdmissionGate(LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT)
+
+anthropic_client = AsyncAnthropic(api_key=api_key)
 
 class AnalysisRequest(BaseModel):
     option: Optional[str] = None
     message: Optional[str] = None
-    userData: Dict[str, Any]
-    workouts: List[Dict[str, Any]]
+    user_id: Optional[UUID] = None
+    userData: Dict[str, Any] = {}
+    workouts: List[Dict[str, Any]] = []
     conversationHistory: List[Dict[str, str]] = []
 
 class AnalysisResponse(BaseModel):
     success: bool
     message: str
     error: Optional[str] = None
-
-def format_workout_data(workouts: List[Dict[str, Any]], limit: int = 100) -> str:
-    """Format workout data for Claude context"""
-    sorted_workouts = sorted(workouts, key=lambda x: x['date'], reverse=True)[:limit]
-    
-    workout_summary = []
-    for workout in sorted_workouts:
-        workout_info = f"Date: {workout['date']}\n"
-        workout_info += f"Name: {workout.get('name', 'Unnamed Workout')}\n"
-        workout_info += f"Duration: {workout.get('duration', 'N/A')} minutes\n"
-        
-        if 'detailed_exercises' in workout:
-            workout_info += "Exercises:\n"
-            for exercise in workout['detailed_exercises']:
-                workout_info += f"  - {exercise['name']}: "
-                sets_info = []
-                for set_data in exercise.get('sets', []):
-                    weight = set_data.get('weight', '0')
-                    reps = set_data.get('reps', '0')
-                    sets_info.append(f"{weight}lbs x {reps} reps")
-                workout_info += ", ".join(sets_info) + "\n"
-        
-        if workout.get('notes'):
-            workout_info += f"Notes: {workout['notes']}\n"
-        
-        workout_summary.append(workout_info)
-    
-    return "\n---\n".join(workout_summary)
+    cached: bool = False
 
 def format_user_data(user_data: Dict[str, Any]) -> str:
     """Format user data for Claude context"""
@@ -117,46 +113,173 @@ Important guidelines:
     
     return base_prompt + "\n\n" + option_prompts.get(option, "")
 
-@router.post("/chat", response_model=AnalysisResponse)
-async def analyze_workouts(
+async def load_context(
+    session: AsyncSession,
+    request: AnalysisRequest
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Get the profile and recent hydrated workouts for the prompt, from the database when user_id is given"""
+    if request.user_id is None:
+        return request.userData, request.workouts
+    
+    user = await session.get(UsersDB, request.user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    workouts = []
+    if request.option:
+        workouts = await session.run_sync(
+            workouts_models.get_recent_with_details, request.user_id, ANALYSIS_WORKOUT_LIMIT
+        )
+    return user.dict(exclude={"hashed_password"}), workouts
+
+def build_completion(
     request: AnalysisRequest,
-    session: Session = Depends(get_session)
-):
-    """Handle AI analysis requests using Claude"""
-    try:
-        user_context = format_user_data(request.userData)
-        workout_context = format_workout_data(request.workouts)
-        
-        messages = []
-        
-        for msg in request.conversationHistory:
-            role = "user" if msg["role"] == "Human" else "assistant"
-            messages.append({
-                "role": role,
-                "content": msg["content"]
-            })
-        
-        if request.option:
-            system_prompt = get_initial_prompt(request.option)
-            user_message = f"""{user_context}
+    user_data: Dict[str, Any],
+    workouts: List[Dict[str, Any]]
+) -> Dict[str, Any]:
+    """Build the Claude messages call for an analysis request"""
+    messages = []
+    
+    for msg in request.conversationHistory:
+        role = "user" if msg["role"] == "Human" else "assistant"
+        messages.append({
+            "role": role,
+            "content": msg["content"]
+        })
+    
+    if request.option:
+        user_context = format_user_data(user_data)
+        workout_context = build_workout_context(workouts)
+        system_prompt = get_initial_prompt(request.option)
+        user_message = f"""{user_context}
 
 Recent Workout History:
 {workout_context}
 
 Based on this information, please provide your analysis and recommendations."""
-        else:
-            system_prompt = get_initial_prompt("analyze_recent")
-            user_message = request.message
-        
-        response = anthropic_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=1500,
-            temperature=0.7,
-            system=system_prompt,
-            messages=messages + [{"role": "user", "content": user_message}]
+    else:
+        system_prompt = get_initial_prompt("analyze_recent")
+        user_message = request.message
+    
+    return {
+        "model": "claude-3-5-sonnet-20241022",
+        "max_tokens": 1500,
+        "temperature": 0.7,
+        "system": system_prompt,
+        "messages": messages + [{"role": "user", "content": user_message}],
+    }
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def cache_key(request: AnalysisRequest, completion: Dict[str, Any]) -> Optional[str]:
+    """Hash an option prompt (model, settings, system prompt, messages with the formatted context); free-form messages are not cached"""
+    if not request.option:
+        return None
+    payload = json.dumps({"option": request.option, **completion}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def get_cached(key: Optional[str]) -> Optional[str]:
+    """Look an answer up in memory, then in Postgres when ANALYSIS_CACHE_DB is set"""
+    if key is None:
+        return None
+    message = analysis_cache.get(key)
+    if message is None and ANALYSIS_CACHE_DB:
+        async with async_session_maker() as cache_session:
+            message = await cache_session.run_sync(analysis_cache_models.get, key, ANALYSIS_CACHE_TTL)
+        if message is not None:
+            analysis_cache.set(key, message)
+    return message
+
+async def store_cached(key: Optional[str], request: AnalysisRequest, completion: Dict[str, Any], message: str):
+    """Remember an answer in memory and, when enabled, in Postgres"""
+    if key is None or not message:
+        return
+    analysis_cache.set(key, message)
+    if ANALYSIS_CACHE_DB:
+        try:
+            async with async_session_maker() as cache_session:
+                await cache_session.run_sync(
+                    analysis_cache_models.put, key, request.option, completion["model"], message, ANALYSIS_CACHE_TTL
+                )
+        except Exception as e:
+            print(f"Analysis cache write error: {str(e)}")
+
+def quota_user(request: AnalysisRequest) -> UUID:
+    """Get the user a request counts against, from user_id or the legacy userData body; raises 400 without one"""
+    if request.user_id is not None:
+        return request.user_id
+    item_id = request.userData.get("item_id")
+    if not item_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="user_id is required"
+        )
+    try:
+        return UUID(str(item_id))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid user id"
+        )
+
+def seconds_until_reset() -> int:
+    """Seconds until the daily quota resets at local midnight"""
+    now = datetime.now()
+    return int((datetime.combine(now.date() + timedelta(days=1), time.min) - now).total_seconds()) + 1
+
+async def admit(session: AsyncSession, user_id: UUID):
+    """Reserve one call from the user's daily quota, then a model slot; raises 429 or 503"""
+    reserved = await session.run_sync(analysis_usage_models.reserve, user_id, ANALYSIS_DAILY_LIMIT)
+    if not reserved:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Daily analysis limit reached",
+            headers={"Retry-After": str(seconds_until_reset())}
+        )
+    try:
+        await llm_gate.acquire()
+    except Overloaded as e:
+        await refund(user_id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
         )
+
+async def refund(user_id: UUID):
+    """Return a reserved quota call after a failed model call (uses its own session)"""
+    try:
+        async with async_session_maker() as usage_session:
+            await usage_session.run_sync(analysis_usage_models.refund, user_id)
+    except Exception as e:
+        print(f"Analysis quota refund error: {str(e)}")
+
+@router.post("/chat", response_model=AnalysisResponse)
+async def analyze_workouts(
+    request: AnalysisRequest,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Handle AI analysis requests using Claude"""
+    user_id = quota_user(request)
+    user_data, workouts = await load_context(session, request)
+    completion = build_completion(request, user_data, workouts)
+    key = cache_key(request, completion)
+    cached_message = await get_cached(key)
+    if cached_message is not None:
+        return AnalysisResponse(success=True, message=cached_message, cached=True)
+    
+    await admit(session, user_id)
+    try:
+        response = await anthropic_client.messages.create(**completion)
         
         assistant_message = response.content[0].text
+        await store_cached(key, request, completion, assistant_message)
         
         return AnalysisResponse(
             success=True,
@@ -165,20 +288,69 @@ Based on this information, please provide your analysis and recommendations."""
         
     except Exception as e:
         print(f"Analysis error: {str(e)}")
+        await refund(user_id)
         return AnalysisResponse(
             success=False,
             message="I apologize, but I encountered an error processing your request.",
             error=str(e)
         )
+    finally:
+        llm_gate.release()
+
+@router.post("/chat/stream")
+async def stream_analysis(
+    request: AnalysisRequest,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Stream an AI analysis as server-sent events: text deltas, then a done or error event.
+
+    The model slot is released by the response once sending ends, so it is
+    returned even when the client disconnects before the stream starts.
+    """
+    user_id = quota_user(request)
+    user_data, workouts = await load_context(session, request)
+    completion = build_completion(request, user_data, workouts)
+    key = cache_key(request, completion)
+    cached_message = await get_cached(key)
+    
+    async def replay():
+        yield sse_event({"text": cached_message})
+        yield sse_event({"success": True, "cached": True}, event="done")
+    
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if cached_message is not None:
+        return StreamingResponse(replay(), media_type="text/event-stream", headers=headers)
+    
+    await admit(session, user_id)
+    
+    async def events():
+        try:
+            chunks = []
+            async with anthropic_client.messages.stream(**completion) as stream:
+                async for text in stream.text_stream:
+                    chunks.append(text)
+                    yield sse_event({"text": text})
+            await store_cached(key, request, completion, "".join(chunks))
+            yield sse_event({"success": True}, event="done")
+        except Exception as e:
+            print(f"Analysis stream error: {str(e)}")
+            await refund(user_id)
+            yield sse_event({"success": False, "error": str(e)}, event="error")
+    
+    return ClosingStreamingResponse(
+        events(), on_close=llm_gate.release, media_type="text/event-stream", headers=headers
+    )
 
 @router.get("/usage/{user_id}")
 async def get_usage_stats(
-    user_id: str,
-    session: Session = Depends(get_session)
+    user_id: UUID,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Get usage statistics for a user"""
+    """Get a user's model calls today against the daily limit, plus current model load"""
+    used = await session.run_sync(analysis_usage_models.get_used, user_id)
     return {
-        "daily_messages_used": 0,
-        "daily_limit": 5,
-        "last_reset": datetime.now().date().isoformat()
+        "daily_messages_used": used,
+        "daily_limit": ANALYSIS_DAILY_LIMIT,
+        "last_reset": datetime.now().date().isoformat(),
+        "queue": llm_gate.stats()
     }
\ No newline at end of file
@@ -1,10 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
 from typing import List
 
-from utils.db import get_session
+from utils.db import get_async_session
 from utils.auth import hash_password
+from utils.http import etag_matches
 from models import exercises as exercises_models
 
 
@@ -12,27 +14,27 @@ router = APIRouter(tags=["Exercises"])
 
 
 @router.get("/exercises")
-def get_exercises(session: Session = Depends(get_session)):
+async def get_exercises(request: Request, session: AsyncSession = Depends(get_async_session)):
     """Get all exercises"""
     print("Fetching all exercises")
-    statement = select(exercises_models.ExercisesDB)
-    exercises = session.exec(statement).all()
-    statement = select(exercises_models.ExercisesDB.category).distinct()
-    categories = session.exec(statement).all()
-    statement = select(exercises_models.ExercisesDB.equipment).distinct()
-    equipment = session.exec(statement).all() 
-    return {"exercises": exercises, "categories": categories, "equipment": equipment}
+    catalog = await session.run_sync(exercises_models.get_catalog)
+    headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+    
+    if etag_matches(request, catalog.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
 
 
 @router.post("/exercises", response_model=exercises_models.ExercisesDB, status_code=status.HTTP_201_CREATED)
-def create_exercise(
+async def create_exercise(
     exercise: exercises_models.ExercisesCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Create a new exercise"""
-    existing_exercise = session.exec(
+    existing_exercise = (await session.exec(
         select(exercises_models.ExercisesDB).where(exercises_models.ExercisesDB.name == exercise.name)
-    ).first()
+    )).first()
     
     if existing_exercise:
         raise HTTPException(
@@ -40,5 +42,5 @@ def create_exercise(
             detail="Exercise with this name already exists"
         )
     
-    db_exercise = exercises_models.create(session, exercise)
+    db_exercise = await session.run_sync(exercises_models.create, exercise)
     return db_exercise
@@ -1,51 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
-from utils.db import get_session
+from utils.db import get_async_session
+from utils.http import etag_matches
+from utils.responses import FastJSONResponse, to_dict
 from models import planned_workouts as planned_workouts_models
 from models import exercises as exercises_models
+from models import sync as sync_models
 
-router = APIRouter(tags=["Planned Workouts"])
+router = APIRouter(tags=["Planned Workouts"], default_response_class=FastJSONResponse)
 
 
 @router.get("/planned-workouts")
-def get_planned_workouts(user_id: str, session: Session = Depends(get_session)):
-    """Get all planned workouts for a user"""
-    print(f"Fetching all planned workouts for user {user_id}")
-    statement = select(planned_workouts_models.PlannedWorkoutsDB).where(
-        planned_workouts_models.PlannedWorkoutsDB.user_id == UUID(user_id)
+async def get_planned_workouts(
+    user_id: str,
+    request: Request,
+    since: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get all planned workouts for a user, or only those changed since a previous sync_token"""
+    user_uuid = UUID(user_id)
+    state = await session.run_sync(
+        sync_models.get_state, planned_workouts_models.PlannedWorkoutsDB, user_uuid, "planned_workout"
     )
-    planned_workouts = session.exec(statement).all()
+    headers = {"ETag": state.etag(str(request.query_params)), "Cache-Control": "no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    deleted = None
+    sync_token = state.sync_token
+    if since is not None:
+        print(f"Fetching planned workouts changed since {since} for user {user_id}")
+        changes = await session.run_sync(
+            sync_models.get_changes, planned_workouts_models.PlannedWorkoutsDB, user_uuid, "planned_workout", since
+        )
+        planned_workouts, deleted, sync_token = changes["items"], changes["deleted"], changes["sync_token"]
+    else:
+        print(f"Fetching all planned workouts for user {user_id}")
+        statement = select(planned_workouts_models.PlannedWorkoutsDB).where(
+            planned_workouts_models.PlannedWorkoutsDB.user_id == user_uuid
+        )
+        planned_workouts = (await session.exec(statement)).all()
     
-    for workout in planned_workouts:
-        workout.exercise_details = []
-        for i, exercise_id in enumerate(workout.exercises):
-            exercise = session.get(exercises_models.ExercisesDB, exercise_id)
-            if exercise:
-                exercise_dict = exercise.dict()
-                if i < len(workout.exercise_performances):
-                    performance = workout.exercise_performances[i]
-                    if performance.get('exercise_id') == str(exercise_id):
-                        exercise_dict['sets'] = performance.get('sets', [])
-                workout.exercise_details.append(exercise_dict)
+    exercise_details = await session.run_sync(exercises_models.hydrate, planned_workouts)
+    planned_workouts = [
+        {**to_dict(workout), "exercise_details": details}
+        for workout, details in zip(planned_workouts, exercise_details)
+    ]
     
-    return {"planned_workouts": planned_workouts}
+    result = {"planned_workouts": planned_workouts, "sync_token": sync_token}
+    if deleted is not None:
+        result["deleted"] = deleted
+    return FastJSONResponse(result, headers=headers)
 
 
 @router.post("/planned-workouts", response_model=planned_workouts_models.PlannedWorkoutsDB, status_code=status.HTTP_201_CREATED)
-def create_planned_workout(
+async def create_planned_workout(
     workout: planned_workouts_models.PlannedWorkoutsCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Create a new planned workout"""
     print(f"Creating planned workout for user {workout.user_id}")
     
     try:
-        db_workout = planned_workouts_models.create(session, workout)
-        return db_workout
+        db_workout = await session.run_sync(planned_workouts_models.create, workout)
+        return FastJSONResponse(db_workout, status_code=status.HTTP_201_CREATED)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -60,12 +83,12 @@ def create_planned_workout(
 
 
 @router.get("/planned-workouts/{workout_id}")
-def get_planned_workout(
+async def get_planned_workout(
     workout_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get a specific planned workout by ID with exercise details"""
-    workout = session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
+    workout = await session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -80,42 +103,22 @@ def get_planned_workout(
         "notes": workout.notes,
         "user_id": str(workout.user_id),
         "exercises": [str(ex_id) for ex_id in workout.exercises],
-        "exercise_performances": workout.exercise_performances,
-        "exercise_details": []
+        "exercise_performances": workout.exercise_performances
     }
     
-    for i, exercise_id in enumerate(workout.exercises):
-        exercise = session.get(exercises_models.ExercisesDB, exercise_id)
-        if exercise:
-            exercise_data = {
-                "item_id": str(exercise.item_id),
-                "name": exercise.name,
-                "description": exercise.description,
-                "category": exercise.category,
-                "equipment": exercise.equipment,
-                "muscles": exercise.muscles,
-                "sub_muscles": exercise.sub_muscles,
-                "sets": []
-            }
-            
-            if i < len(workout.exercise_performances):
-                performance = workout.exercise_performances[i]
-                if performance.get('exercise_id') == str(exercise_id):
-                    exercise_data['sets'] = performance.get('sets', [])
-            
-            workout_dict['exercise_details'].append(exercise_data)
+    workout_dict['exercise_details'] = (await session.run_sync(exercises_models.hydrate, [workout]))[0]
     
     return workout_dict
 
 
 @router.put("/planned-workouts/{workout_id}", response_model=planned_workouts_models.PlannedWorkoutsDB)
-def update_planned_workout(
+async def update_planned_workout(
     workout_id: UUID,
     workout_update: planned_workouts_models.PlannedWorkoutsBase,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update an existing planned workout"""
-    workout = session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
+    workout = await session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -125,29 +128,30 @@ def update_planned_workout(
     for field, value in workout_update.dict(exclude_unset=True).items():
         setattr(workout, field, value)
     
-    workout.item_modified = datetime.utcnow()
+    workout.update()
     
     session.add(workout)
-    session.commit()
-    session.refresh(workout)
+    await session.commit()
+    await session.refresh(workout)
     
-    return workout
+    return FastJSONResponse(workout)
 
 
 @router.delete("/planned-workouts/{workout_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_planned_workout(
+async def delete_planned_workout(
     workout_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete a planned workout"""
-    workout = session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
+    workout = await session.get(planned_workouts_models.PlannedWorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Planned workout not found"
         )
     
-    session.delete(workout)
-    session.commit()
+    await session.run_sync(sync_models.record_deletion, workout.item_id, workout.user_id, "planned_workout")
+    await session.delete(workout)
+    await session.commit()
     
     return None
\ No newline at end of file
@@ -1,34 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
-from typing import List
+from typing import List, Optional
+from datetime import date
 
-from utils.db import get_session
-from utils.auth import hash_password
+from utils.db import get_async_session
+from utils.auth import hash_password_async, verify_and_update_async
+from utils.activity import activity_buffer
 from models import users as users_models
+from models import muscle_activation as muscle_activation_models
+from models import personal_records as personal_records_models
+from models import progression as progression_models
 
 
 router = APIRouter(tags=["Users"])
 
 
 @router.get("/usernames")
-def get_usernames(session: Session = Depends(get_session)):
+async def get_usernames(session: AsyncSession = Depends(get_async_session)):
     """Get all usernames"""
     print("Fetching all usernames")
     statement = select(users_models.UsersDB.username)
-    usernames = session.exec(statement).all()
+    usernames = (await session.exec(statement)).all()
     return {"usernames": usernames}
 
 
 @router.post("/create", response_model=users_models.UsersResponse, status_code=status.HTTP_201_CREATED)
-def create_user(
+async def create_user(
     user: users_models.UsersCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Create a new user"""
-    existing_user = session.exec(
+    existing_user = (await session.exec(
         select(users_models.UsersDB).where(users_models.UsersDB.username == user.username)
-    ).first()
+    )).first()
     
     if existing_user:
         raise HTTPException(
@@ -36,43 +42,54 @@ def create_user(
             detail="Username already exists"
         )
     
-    db_user = users_models.create(session, user)
+    hashed_password = await hash_password_async(user.password)
+    db_user = await session.run_sync(users_models.create, user, hashed_password)
     return db_user
 
 
 @router.post("/login", response_model=users_models.UsersResponse, status_code=status.HTTP_200_OK)
-def login_user(
+async def login_user(
     user: users_models.UsersLogin,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Login a user"""
-    db_user = session.exec(
+    """Login a user, verifying the password once in the bcrypt process pool"""
+    db_user = (await session.exec(
         select(users_models.UsersDB).where(users_models.UsersDB.username == user.username)
-    ).first()
-
-    print(f"User password: {user.password}")
-    print(f"DB User: {db_user.hashed_password if db_user else 'None'}")
+    )).first()
+    
+    verified, new_hash = False, None
+    if db_user:
+        verified, new_hash = await verify_and_update_async(user.password, db_user.hashed_password)
     
-    if not db_user or not users_models.verify_password(user.password, db_user.hashed_password):
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
     
-    db_user = users_models.authenticate(session, user.username, user.password)
+    if new_hash:
+        db_user = await session.run_sync(users_models.store_rehash, db_user, new_hash)
+    
+    # last_use is written behind in batches; only the response carries it right away
+    session.expunge(db_user)
+    db_user.last_use = activity_buffer.record(db_user.item_id)
     
     return db_user
 
 
 @router.put("/users/{user_id}", response_model=users_models.UsersResponse, status_code=status.HTTP_200_OK)
-def update_user(
+async def update_user(
     user_id: UUID,
     user_update: users_models.UsersUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update user information"""
     try:
-        db_user, updated = users_models.update(session, str(user_id), user_update)
+        password = user_update.dict(exclude_unset=True).get('password')
+        hashed_password = await hash_password_async(password) if password else None
+        db_user, updated = await session.run_sync(
+            users_models.update, str(user_id), user_update, hashed_password
+        )
         
         if not updated:
             return HTTPException(
@@ -96,13 +113,13 @@ def update_user(
 
 
 @router.get("/users/{user_id}", response_model=users_models.UsersResponse, status_code=status.HTTP_200_OK)
-def get_user(
+async def get_user(
     user_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get a specific user by ID"""
     statement = select(users_models.UsersDB).where(users_models.UsersDB.item_id == user_id)
-    db_user = session.exec(statement).first()
+    db_user = (await session.exec(statement)).first()
     
     if not db_user:
         raise HTTPException(
@@ -110,4 +127,35 @@ def get_user(
             detail="User not found"
         )
     
-    return db_user
\ No newline at end of file
+    return db_user
+
+
+@router.get("/users/{user_id}/muscle-activation", status_code=status.HTTP_200_OK)
+async def get_muscle_activation(
+    user_id: UUID,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get normalized muscle activation for a user's sets in a date window"""
+    return await session.run_sync(muscle_activation_models.get_activation, user_id, date_from, date_to)
+
+
+@router.get("/users/{user_id}/records", status_code=status.HTTP_200_OK)
+async def get_personal_records(
+    user_id: UUID,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get a user's personal records per exercise, with the most reps at each weight"""
+    return {"records": await session.run_sync(personal_records_models.get_for_user, user_id)}
+
+
+@router.get("/users/{user_id}/exercises/{exercise_id}/progression", status_code=status.HTTP_200_OK)
+async def get_exercise_progression(
+    user_id: UUID,
+    exercise_id: UUID,
+    points: Optional[int] = Query(None, ge=3, le=5000),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get per-session progression for one exercise, optionally downsampled to `points` sessions"""
+    return await session.run_sync(progression_models.get_progression, user_id, exercise_id, points)
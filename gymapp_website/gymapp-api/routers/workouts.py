@@ -1,38 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from uuid import UUID
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional
+from datetime import datetime, date
 
-from utils.db import get_session
+from utils.db import get_async_session
+from utils.http import etag_matches
+from utils.responses import FastJSONResponse
 from models import workouts as workouts_models
 from models import exercises as exercises_models
+from models import weekly_rollups as weekly_rollups_models
+from models import sync as sync_models
 
-router = APIRouter(tags=["Workouts"])
+router = APIRouter(tags=["Workouts"], default_response_class=FastJSONResponse)
 
 
 @router.get("/workouts")
-def get_workouts(item_id: str, session: Session = Depends(get_session)):
-    """Get all workouts for a user"""
+async def get_workouts(
+    item_id: str,
+    request: Request,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get workouts for a user, optionally filtered by date, paginated or as a delta.
+
+    Passing ``limit`` (or a ``cursor`` from a previous page) switches to
+    keyset pagination, newest first, with next/prev cursors in the response.
+    Passing ``since`` (a previous ``sync_token``) returns only workouts
+    changed after it plus the ids of deleted ones. Every mode carries an
+    ETag and answers a matching If-None-Match with 304.
+    """
+    user_id = UUID(item_id)
+    state = await session.run_sync(sync_models.get_state, workouts_models.WorkoutsDB, user_id, "workout")
+    headers = {"ETag": state.etag(str(request.query_params)), "Cache-Control": "no-cache"}
+    if etag_matches(request, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    if since is not None:
+        print(f"Fetching workouts changed since {since} for user {item_id}")
+        changes = await session.run_sync(
+            sync_models.get_changes, workouts_models.WorkoutsDB, user_id, "workout", since
+        )
+        return FastJSONResponse(
+            {"workouts": changes["items"], "deleted": changes["deleted"], "sync_token": changes["sync_token"]},
+            headers=headers
+        )
+    
+    if limit is not None or cursor is not None:
+        print(f"Fetching a page of workouts for user {item_id}")
+        try:
+            page = await session.run_sync(
+                workouts_models.get_page, user_id, limit or 50, cursor, date_from, date_to
+            )
+            return FastJSONResponse(page, headers=headers)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
     print(f"Fetching all workouts for user {item_id}")
     statement = select(workouts_models.WorkoutsDB).where(
-        workouts_models.WorkoutsDB.user_id == UUID(item_id)
+        workouts_models.WorkoutsDB.user_id == user_id
     )
-    workouts = session.exec(statement).all()
-    return {"workouts": workouts}
+    statement = workouts_models.filter_by_date(statement, date_from, date_to)
+    workouts = (await session.exec(statement)).all()
+    return FastJSONResponse({"workouts": workouts, "sync_token": state.sync_token}, headers=headers)
 
 
 @router.post("/workouts", response_model=workouts_models.WorkoutsDB, status_code=status.HTTP_201_CREATED)
-def create_workout(
+async def create_workout(
     workout: workouts_models.WorkoutsCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Create a new workout"""
     print(f"Creating workout for user {workout.user_id}")
     
     try:
-        db_workout = workouts_models.create(session, workout)
-        return db_workout
+        db_workout = await session.run_sync(workouts_models.create, workout)
+        return FastJSONResponse(db_workout, status_code=status.HTTP_201_CREATED)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -46,13 +97,61 @@ def create_workout(
         )
 
 
+@router.post("/workouts/bulk")
+async def create_workouts_bulk(
+    workouts: List[Dict[str, Any]],
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Create many workouts in one transaction and report a result per item"""
+    if len(workouts) > workouts_models.MAX_BULK_WORKOUTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {workouts_models.MAX_BULK_WORKOUTS} workouts per request"
+        )
+    print(f"Creating {len(workouts)} workouts in bulk")
+
+    results = await session.run_sync(workouts_models.create_many, workouts)
+    created = sum(1 for result in results if result['status'] == 'created')
+    return FastJSONResponse({"created": created, "failed": len(results) - created, "results": results})
+
+
+@router.get("/workouts/summaries")
+async def get_workout_summaries(
+    user_id: UUID,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    ids: Optional[List[UUID]] = Query(None),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get set, rep, volume and exercise totals for every workout of a user, or only the given ids"""
+    print(f"Fetching workout summaries for user {user_id}")
+    summaries = await session.run_sync(
+        workouts_models.get_summaries, user_id=user_id, workout_ids=ids, date_from=date_from, date_to=date_to
+    )
+    return FastJSONResponse({"summaries": summaries})
+
+
+@router.get("/workouts/rollups")
+async def get_workout_rollups(
+    user_id: UUID,
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: Optional[date] = Query(None, alias="to"),
+    period: str = Query("week", pattern="^(week|month)$"),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Get set, rep and tonnage totals per muscle group by week or month"""
+    print(f"Fetching {period}ly rollups for user {user_id}")
+    rollups = await session.run_sync(weekly_rollups_models.get_for_user, user_id, date_from, date_to, period)
+    return {"rollups": rollups}
+
+
 @router.get("/workouts/{workout_id}")
-def get_workout(
+async def get_workout(
     workout_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get a specific workout by ID with detailed exercise information"""
-    workout = session.get(workouts_models.WorkoutsDB, workout_id)
+    workout = await session.get(workouts_models.WorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -71,104 +170,68 @@ def get_workout(
         "notes": workout.notes,
         "user_id": str(workout.user_id),
         "exercises": [str(ex_id) for ex_id in workout.exercises],
-        "exercise_performances": workout.exercise_performances,
-        "detailed_exercises": []
+        "exercise_performances": workout.exercise_performances
     }
     
-    for i, exercise_id in enumerate(workout.exercises):
-        exercise = session.get(exercises_models.ExercisesDB, exercise_id)
-        if exercise:
-            exercise_data = {
-                "item_id": str(exercise.item_id),
-                "name": exercise.name,
-                "description": exercise.description,
-                "category": exercise.category,
-                "equipment": exercise.equipment,
-                "muscles": exercise.muscles,
-                "sub_muscles": exercise.sub_muscles,
-                "sets": []
-            }
-            
-            if i < len(workout.exercise_performances):
-                performance = workout.exercise_performances[i]
-                if performance.get('exercise_id') == str(exercise_id):
-                    exercise_data['sets'] = performance.get('sets', [])
-            
-            workout_dict['detailed_exercises'].append(exercise_data)
+    workout_dict['detailed_exercises'] = (await session.run_sync(exercises_models.hydrate, [workout]))[0]
     
     return workout_dict
 
 
 @router.put("/workouts/{workout_id}", response_model=workouts_models.WorkoutsDB)
-def update_workout(
+async def update_workout(
     workout_id: UUID,
     workout_update: workouts_models.WorkoutsBase,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Update an existing workout"""
-    workout = session.get(workouts_models.WorkoutsDB, workout_id)
+    workout = await session.get(workouts_models.WorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workout not found"
         )
     
-    for field, value in workout_update.dict(exclude_unset=True).items():
-        setattr(workout, field, value)
-    
-    workout.item_modified = datetime.utcnow()
-    
-    session.add(workout)
-    session.commit()
-    session.refresh(workout)
-    
-    return workout
+    return FastJSONResponse(await session.run_sync(workouts_models.update, workout, workout_update))
 
 
 @router.delete("/workouts/{workout_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_workout(
+async def delete_workout(
     workout_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Delete a workout"""
-    workout = session.get(workouts_models.WorkoutsDB, workout_id)
+    workout = await session.get(workouts_models.WorkoutsDB, workout_id)
     if not workout:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Workout not found"
         )
     
-    session.delete(workout)
-    session.commit()
+    await session.run_sync(workouts_models.delete, workout)
     
     return None
 
 
 @router.get("/workouts/{workout_id}/summary")
-def get_workout_summary(
+async def get_workout_summary(
     workout_id: UUID,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Get a workout summary with exercise details for display"""
-    workout_data = get_workout(workout_id, session)
-    
-    total_sets = 0
-    total_weight = 0
-    total_reps = 0
+    workout_data = await get_workout(workout_id, session)
     
-    for exercise in workout_data['detailed_exercises']:
-        for set_data in exercise.get('sets', []):
-            total_sets += 1
-            weight = float(set_data.get('weight', 0) or 0)
-            reps = float(set_data.get('reps', 0) or 0)
-            total_weight += weight
-            total_reps += reps
+    totals = (await session.run_sync(workouts_models.get_summaries, workout_ids=[workout_id]))[0]
+    total_sets = totals['total_sets']
+    total_weight = totals['total_weight']
+    total_reps = totals['total_reps']
     
     workout_data['summary'] = {
         'total_exercises': len(workout_data['detailed_exercises']),
         'total_sets': total_sets,
         'total_weight': total_weight,
         'total_reps': total_reps,
+        'total_volume': totals['total_volume'],
         'avg_weight_per_set': total_weight / total_sets if total_sets > 0 else 0,
         'avg_reps_per_set': total_reps / total_sets if total_sets > 0 else 0
     }
@@ -0,0 +1,46 @@
+import os
+import sys
+from datetime import datetime
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import (  # noqa: F401
+    analysis_cache, analysis_usage, personal_records, planned_workouts, sync, weekly_rollups, workout_sets, workouts
+)
+from models import exercises as exercises_models
+from models.exercises import ExercisesDB
+from models.users import UsersDB
+
+
+@pytest.fixture
+def session():
+    """A session on an in-memory SQLite database with every table, using the default JSON serializer"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    exercises_models.invalidate_catalog()
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+@pytest.fixture
+def user(session):
+    user = UsersDB(
+        username="tester", first_name="Test", last_name="User", age=30, height=180, weight=180,
+        sex="M", experience=3, last_use=datetime(2024, 1, 1), goal=[], hashed_password="x"
+    )
+    session.add(user)
+    session.commit()
+    return user
+
+
+@pytest.fixture
+def exercise(session):
+    exercise = ExercisesDB(name="Bench Press", category="Strength", equipment="Barbell", muscles=["Chest"], sub_muscles=["Triceps"])
+    session.add(exercise)
+    session.commit()
+    return exercise
@@ -0,0 +1,20 @@
+from datetime import datetime, timedelta
+
+from sqlmodel import select
+
+from models import analysis_cache as analysis_cache_models
+
+
+def test_put_deletes_expired_answers(session):
+    session.add(analysis_cache_models.AnalysisCacheDB(
+        cache_key="old", option="progress", model="m", message="stale",
+        created_at=datetime.now() - timedelta(days=2)
+    ))
+    session.add(analysis_cache_models.AnalysisCacheDB(cache_key="recent", option="progress", model="m", message="fresh"))
+    session.commit()
+
+    analysis_cache_models.put(session, "new", "progress", "m", "answer", ttl_seconds=86400)
+
+    keys = set(session.exec(select(analysis_cache_models.AnalysisCacheDB.cache_key)).all())
+    assert keys == {"recent", "new"}
+    assert analysis_cache_models.get(session, "new", 86400) == "answer"
@@ -0,0 +1,52 @@
+from models import exercises as exercises_models
+from models import muscle_activation as muscle_activation_models
+from models import workouts as workouts_models
+
+
+def heatmap_activation(exercises_with_sets):
+    """Port of AnatomyHeatmap.vue's muscleActivation and maxActivation"""
+    activation = {muscle: 0 for muscle in muscle_activation_models.HEATMAP_MUSCLES}
+    for exercise, sets in exercises_with_sets:
+        for muscle in exercise.muscles or []:
+            activation[muscle] = activation.get(muscle, 0) + sets
+        for muscle in exercise.sub_muscles or []:
+            activation[muscle] = activation.get(muscle, 0) + sets * 0.5
+    peak = max(max(activation.values()), 1)
+    return {muscle: value / peak for muscle, value in activation.items()}
+
+
+def test_activation_matches_the_heatmap(session, user, exercise):
+    exercise.muscles = ["Chest", "Triceps"]
+    exercise.sub_muscles = ["Triceps", "Shoulders"]
+    session.add(exercise)
+    session.commit()
+    exercises_models.invalidate_catalog()
+    workouts_models.create(session, workouts_models.WorkoutsCreate(
+        user_id=user.item_id,
+        workout_list=[{'item_id': str(exercise.item_id), 'name': exercise.name, 'sets': [{'weight': '100', 'reps': '5'}] * 3}]
+    ))
+
+    result = muscle_activation_models.get_activation(session, user.item_id)
+    activation = dict(zip(result['muscles'], result['activation']))
+
+    expected = heatmap_activation([(exercise, 3)])
+    assert set(activation) == set(expected)
+    for muscle, value in expected.items():
+        assert activation[muscle] == round(value, 4)
+    assert activation['Triceps'] == 1.0
+    assert activation['Chest'] == round(1 / 1.5, 4)
+
+
+def test_single_sub_muscle_set_is_not_scaled_up(session, user, exercise):
+    exercise.muscles = []
+    exercise.sub_muscles = ["Forearms"]
+    session.add(exercise)
+    session.commit()
+    exercises_models.invalidate_catalog()
+    workouts_models.create(session, workouts_models.WorkoutsCreate(
+        user_id=user.item_id,
+        workout_list=[{'item_id': str(exercise.item_id), 'name': exercise.name, 'sets': [{'weight': '20', 'reps': '10'}]}]
+    ))
+
+    result = muscle_activation_models.get_activation(session, user.item_id)
+    assert dict(zip(result['muscles'], result['activation']))['Forearms'] == 0.5
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from models import personal_records as personal_records_models
+from models import workouts as workouts_models
+
+
+def log_workout(session, user, exercise, sets, day):
+    return workouts_models.create(session, workouts_models.WorkoutsCreate(
+        user_id=user.item_id,
+        date=datetime(2024, 3, day, 17, 0),
+        workout_list=[{
+            'item_id': str(exercise.item_id),
+            'name': exercise.name,
+            'sets': [{'weight': str(weight), 'reps': str(reps)} for weight, reps in sets],
+        }]
+    ))
+
+
+def reps_at_weight(session, user):
+    [record] = personal_records_models.get_for_user(session, user.item_id)
+    return {entry['weight']: entry['reps'] for entry in record['max_reps_at_weight']}
+
+
+def test_max_reps_are_kept_per_weight(session, user, exercise):
+    log_workout(session, user, exercise, [(100, 8), (120, 3)], day=1)
+    log_workout(session, user, exercise, [(100, 10), (110, 5), (120, 2)], day=3)
+
+    assert reps_at_weight(session, user) == {100: 10, 110: 5, 120: 3}
+    [record] = personal_records_models.get_for_user(session, user.item_id)
+    assert (record['max_weight'], record['max_weight_reps']) == (120, 3)
+
+
+def test_deleting_the_holding_workout_recomputes_rep_records(session, user, exercise):
+    log_workout(session, user, exercise, [(100, 8), (120, 3)], day=1)
+    holder = log_workout(session, user, exercise, [(100, 10), (110, 5)], day=3)
+
+    workouts_models.delete(session, holder)
+
+    assert reps_at_weight(session, user) == {100: 8, 120: 3}
+
+
+def test_rebuild_matches_incremental_rep_records(session, user, exercise):
+    log_workout(session, user, exercise, [(60, 12), (80, 6)], day=1)
+    log_workout(session, user, exercise, [(60, 15), (80, 5)], day=2)
+    incremental = reps_at_weight(session, user)
+
+    personal_records_models.rebuild(session, user.item_id)
+
+    assert reps_at_weight(session, user) == incremental == {60: 15, 80: 6}
@@ -0,0 +1,19 @@
+from sqlmodel import select
+
+from models import planned_workouts as planned_workouts_models
+
+
+def test_create_stores_exercise_ids_as_strings(session, user, exercise):
+    data = planned_workouts_models.PlannedWorkoutsCreate(
+        name="Push day",
+        user_id=user.item_id,
+        workout_list=[{'item_id': str(exercise.item_id), 'name': exercise.name, 'sets': [{'weight': '100', 'reps': '5'}]}]
+    )
+    created = planned_workouts_models.create(session, data)
+    session.expire_all()
+
+    stored = session.exec(
+        select(planned_workouts_models.PlannedWorkoutsDB).where(planned_workouts_models.PlannedWorkoutsDB.item_id == created.item_id)
+    ).one()
+    assert stored.exercises == [str(exercise.item_id)]
+    assert stored.exercise_performances[0]['exercise_id'] == str(exercise.item_id)
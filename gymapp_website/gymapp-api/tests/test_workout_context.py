@@ -0,0 +1,80 @@
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.workout_context import build_workout_context, estimate_tokens, format_workout
+
+START = datetime(2024, 1, 1, 17, 0)
+
+
+def make_workout(i: int, exercises: int = 6, sets: int = 4):
+    """A hydrated workout shaped like get_recent_with_details, two days after the previous one"""
+    return {
+        'name': f"Workout {i}",
+        'date': START + timedelta(days=2 * i),
+        'duration': 60,
+        'notes': "Felt strong",
+        'detailed_exercises': [
+            {
+                'name': f"Exercise {j}",
+                'muscles': ["Chest", "Triceps"] if j % 2 else ["Back", "Biceps"],
+                'sets': [{'weight': str(100 + 5 * k), 'reps': str(10 - k)} for k in range(sets)],
+            }
+            for j in range(exercises)
+        ],
+    }
+
+
+@pytest.mark.parametrize("count", [1, 5, 20, 100, 500])
+@pytest.mark.parametrize("budget", [50, 300, 1000, 4000])
+def test_budget_is_never_exceeded(count, budget):
+    context = build_workout_context([make_workout(i) for i in range(count)], token_budget=budget)
+    assert estimate_tokens(context) <= budget
+
+
+def test_recent_sessions_in_full_detail_older_rolled_up():
+    workouts = [make_workout(i) for i in range(60)]
+    context = build_workout_context(workouts, token_budget=100_000, full_detail=10, weekly_weeks=4)
+
+    for workout in workouts[-10:]:
+        assert format_workout(workout) in context
+    for workout in workouts[:-10]:
+        assert f"Name: {workout['name']}\n" not in context
+    assert "Earlier training (rolled up):" in context
+    assert "Week of " in context
+    assert "Month of " in context
+    assert "omitted" not in context
+
+
+def test_rollups_are_dropped_before_detail_when_over_budget():
+    workouts = [make_workout(i) for i in range(200)]
+    detail_cost = sum(estimate_tokens(format_workout(workout)) + 3 for workout in workouts[-10:])
+    context = build_workout_context(workouts, token_budget=detail_cost + 300, full_detail=10)
+
+    for workout in workouts[-10:]:
+        assert format_workout(workout) in context
+    assert "older sessions omitted)" in context
+
+
+def test_empty_history():
+    assert build_workout_context([], token_budget=4000) == ""
+
+
+def test_single_oversized_workout():
+    workout = make_workout(0, exercises=40, sets=10)
+    budget = estimate_tokens(format_workout(workout)) // 2
+    context = build_workout_context([workout], token_budget=budget)
+
+    assert "Name: Workout 0" not in context
+    assert context.startswith("Earlier training (rolled up):") or context == "(1 older sessions omitted)"
+    assert estimate_tokens(context) <= budget
+
+
+def test_single_workout_over_any_budget_is_omitted():
+    context = build_workout_context([make_workout(0)], token_budget=10)
+    assert context == "(1 older sessions omitted)"
+    assert estimate_tokens(context) <= 10
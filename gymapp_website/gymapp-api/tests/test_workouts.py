@@ -0,0 +1,98 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import event
+from sqlmodel import select
+
+from models import workouts as workouts_models
+from models.users import UsersDB
+from models.workout_sets import WorkoutSetsDB
+
+
+def workout_item(user, exercise, **overrides):
+    item = {
+        'name': "Push day",
+        'date': datetime(2024, 3, 4, 17, 0).isoformat(),
+        'user_id': str(user.item_id),
+        'workout_list': [
+            {'item_id': str(exercise.item_id), 'name': exercise.name, 'sets': [{'weight': '100', 'reps': '5'}, {'weight': '105', 'reps': '3'}]}
+        ],
+    }
+    item.update(overrides)
+    return item
+
+
+def test_create_stores_exercise_ids_as_strings(session, user, exercise):
+    created = workouts_models.create(session, workouts_models.WorkoutsCreate(**workout_item(user, exercise)))
+    session.expire_all()
+
+    stored = session.get(workouts_models.WorkoutsDB, created.item_id)
+    assert stored.exercises == [str(exercise.item_id)]
+    sets = session.exec(select(WorkoutSetsDB).where(WorkoutSetsDB.workout_id == created.item_id)).all()
+    assert len(sets) == 2
+
+
+def test_create_many_creates_valid_items_and_reports_bad_ones(session, user, exercise):
+    items = [
+        workout_item(user, exercise, name="First"),
+        workout_item(user, exercise, user_id=str(uuid4())),
+        {'name': "No user"},
+        workout_item(user, exercise, name="Second"),
+    ]
+    results = workouts_models.create_many(session, items)
+
+    assert [result['status'] for result in results] == ['created', 'error', 'error', 'created']
+    session.expire_all()
+    names = set(session.exec(select(workouts_models.WorkoutsDB.name)).all())
+    assert names == {"First", "Second"}
+    assert len(session.exec(select(WorkoutSetsDB)).all()) == 4
+
+
+def test_create_many_inserts_in_one_flush(session, user, exercise):
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    results = workouts_models.create_many(session, [workout_item(user, exercise, name=f"W{i}") for i in range(5)])
+
+    assert all(result['status'] == 'created' for result in results)
+    assert sum(1 for statement in statements if statement.startswith("SAVEPOINT")) == 1
+    assert sum(1 for statement in statements if statement.startswith("INSERT INTO workouts ")) == 1
+
+
+def test_create_many_isolates_an_item_that_fails_to_insert(session, user, exercise, monkeypatch):
+    build_sets = workouts_models.workout_sets_models.build
+
+    def build_with_bad_row(workout):
+        rows = build_sets(workout)
+        if workout.name == "Bad":
+            rows[0].exercise_id = None
+        return rows
+
+    monkeypatch.setattr(workouts_models.workout_sets_models, "build", build_with_bad_row)
+    items = [workout_item(user, exercise, name=name) for name in ("First", "Bad", "Second")]
+    results = workouts_models.create_many(session, items)
+
+    assert [result['status'] for result in results] == ['created', 'error', 'created']
+    session.expire_all()
+    assert set(session.exec(select(workouts_models.WorkoutsDB.name)).all()) == {"First", "Second"}
+    assert len(session.exec(select(WorkoutSetsDB)).all()) == 4
+
+
+def test_get_summaries_aggregates_only_the_requested_sets(session, user, exercise):
+    mine = workouts_models.create(session, workouts_models.WorkoutsCreate(**workout_item(user, exercise)))
+    other = UsersDB(
+        username="other", first_name="Other", last_name="User", age=30, height=180, weight=180,
+        sex="F", experience=1, last_use=datetime(2024, 1, 1), goal=[], hashed_password="x"
+    )
+    session.add(other)
+    session.commit()
+    workouts_models.create(session, workouts_models.WorkoutsCreate(**workout_item(other, exercise)))
+
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    summaries = workouts_models.get_summaries(session, user_id=user.item_id)
+
+    assert [summary['workout_id'] for summary in summaries] == [str(mine.item_id)]
+    assert summaries[0]['total_sets'] == 2
+    assert summaries[0]['total_volume'] == 100 * 5 + 105 * 3
+    summary_sql = next(statement for statement in statements if "GROUP BY" in statement)
+    assert summary_sql.count("user_id = ?") == 2
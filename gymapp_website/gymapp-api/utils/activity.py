@@ -0,0 +1,80 @@
+import os
+import asyncio
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import UUID
+from sqlmodel import Session
+from fastapi.concurrency import run_in_threadpool
+
+from utils.db import engine
+from models import users as users_models
+
+ACTIVITY_FLUSH_INTERVAL = float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "5"))
+
+
+class ActivityBuffer:
+    """Write-behind buffer of users' last-seen times.
+
+    Logins record a timestamp in memory; flush() writes everything pending
+    in a single batched UPDATE, so recording activity no longer costs a
+    write transaction per request. A failed flush puts its batch back.
+    """
+
+    def __init__(self):
+        self.pending: Dict[UUID, datetime] = {}
+        self.lock = threading.Lock()
+        self.flushes = 0
+        self.flushed_rows = 0
+
+    def record(self, user_id: UUID, seen_at: Optional[datetime] = None) -> datetime:
+        seen_at = seen_at or datetime.now()
+        with self.lock:
+            if user_id not in self.pending or self.pending[user_id] < seen_at:
+                self.pending[user_id] = seen_at
+        return seen_at
+
+    def drain(self) -> Dict[UUID, datetime]:
+        with self.lock:
+            batch, self.pending = self.pending, {}
+        return batch
+
+    def restore(self, batch: Dict[UUID, datetime]):
+        for user_id, seen_at in batch.items():
+            self.record(user_id, seen_at)
+
+    def flush(self) -> int:
+        """Write pending timestamps with a session of its own (blocking; call from a thread)"""
+        batch = self.drain()
+        if not batch:
+            return 0
+        try:
+            with Session(engine) as session:
+                rows = users_models.record_activity(session, batch)
+        except Exception:
+            self.restore(batch)
+            raise
+        self.flushes += 1
+        self.flushed_rows += rows
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self.pending),
+            "flushes": self.flushes,
+            "flushed_rows": self.flushed_rows,
+            "flush_interval": ACTIVITY_FLUSH_INTERVAL,
+        }
+
+
+activity_buffer = ActivityBuffer()
+
+
+async def flush_periodically(interval: float = ACTIVITY_FLUSH_INTERVAL):
+    """Flush the activity buffer every `interval` seconds until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(activity_buffer.flush)
+        except Exception as e:
+            print(f"Error flushing user activity: {e}")
@@ -1,5 +1,12 @@
 import os
+import time
+import threading
+from uuid import uuid4
 from sqlmodel import Session, create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,14 +18,161 @@ DB_USER = os.getenv("POSTGRES_USER", "user")
 DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "")
 
 DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
-engine = create_engine(DATABASE_URL, echo=False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "yes")
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+# Behind PgBouncer in transaction mode asyncpg must not keep prepared statements per connection
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+class PoolStats:
+    """Running checkout wait and connect latency totals for one engine's pool"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connects = 0
+        self.connect_total = 0.0
+        self.connect_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self.lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self, seconds: float):
+        with self.lock:
+            self.connects += 1
+            self.connect_total += seconds
+            self.connect_max = max(self.connect_max, seconds)
+
+    def snapshot(self, pool) -> dict:
+        with self.lock:
+            return {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checkouts": self.checkouts,
+                "wait_avg_ms": round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3),
+                "connects": self.connects,
+                "connect_avg_ms": round(1000 * self.connect_total / self.connects, 3) if self.connects else 0.0,
+                "connect_max_ms": round(1000 * self.connect_max, 3),
+            }
+
+
+def timed_pool(pool_class):
+    """Subclass a pool class so every checkout records how long it waited.
+
+    Time spent opening a new DBAPI connection during the checkout (stashed in
+    the connection record's info by track_pool) is subtracted, so the wait is
+    only time spent queueing for a free slot. The stats live on the class so
+    they survive pool.recreate() on dispose.
+    """
+    class TimedPool(pool_class):
+        stats = PoolStats()
+
+        def connect(self):
+            start = time.perf_counter()
+            connection = super().connect()
+            setup = connection.info.pop("connect_seconds", 0.0)
+            self.stats.record_wait(max(time.perf_counter() - start - setup, 0.0))
+            return connection
+
+    TimedPool.__name__ = f"Timed{pool_class.__name__}"
+    return TimedPool
+
+
+def track_pool(target_engine):
+    """Time each new DBAPI connection of an engine built with a timed_pool class"""
+    stats = target_engine.pool.stats
+
+    @event.listens_for(target_engine, "do_connect")
+    def start_connect(dialect, conn_rec, cargs, cparams):
+        conn_rec.info["connect_started"] = time.perf_counter()
+
+    @event.listens_for(target_engine, "connect")
+    def finish_connect(dbapi_connection, conn_rec):
+        if DB_STATEMENT_TIMEOUT_MS:
+            set_statement_timeout(dbapi_connection)
+        started = conn_rec.info.pop("connect_started", None)
+        if started is not None:
+            seconds = time.perf_counter() - started
+            conn_rec.info["connect_seconds"] = seconds
+            stats.record_connect(seconds)
+
+
+def set_statement_timeout(dbapi_connection):
+    """Apply DB_STATEMENT_TIMEOUT_MS with SET, since PgBouncer rejects it as a startup option"""
+    # Outside a transaction, or the pool's reset-on-return rollback would undo the SET
+    autocommit = dbapi_connection.autocommit
+    dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"SET statement_timeout = {DB_STATEMENT_TIMEOUT_MS}")
+    cursor.close()
+    dbapi_connection.autocommit = autocommit
+
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+async_connect_args = {}
+if DB_PGBOUNCER:
+    # No asyncpg or SQLAlchemy statement caches, and unique names for the unnamed statements it still prepares
+    async_connect_args = {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+    }
+
+engine = create_engine(DATABASE_URL, echo=False, poolclass=timed_pool(QueuePool), **POOL_OPTIONS)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, echo=False, poolclass=timed_pool(AsyncAdaptedQueuePool),
+    connect_args=async_connect_args, **POOL_OPTIONS
+)
+track_pool(engine)
+track_pool(async_engine.sync_engine)
+async_session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
 def get_session():
     """Dependency function to get database session"""
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    """Dependency function to get an async database session.
+
+    Model functions written against the sync Session run unchanged through
+    ``await session.run_sync(fn, ...)``, which executes their queries on the
+    asyncpg connection without blocking the event loop.
+    """
+    async with async_session_maker() as session:
+        yield session
+
+def get_pool_stats() -> dict:
+    """Live pool occupancy and timing for the sync and async engines"""
+    return {
+        "sync": engine.pool.stats.snapshot(engine.pool),
+        "async": async_engine.pool.stats.snapshot(async_engine.pool),
+    }
+
 def init_db():
-    """Initialize database - create all tables"""
-    SQLModel.metadata.create_all(engine)
\ No newline at end of file
+    """Initialize database - create all tables and any indexes added since"""
+    SQLModel.metadata.create_all(engine)
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
\ No newline at end of file
@@ -0,0 +1,13 @@
+from fastapi import Request
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check whether the request's If-None-Match header already holds this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # The gzipped representation is tagged "<etag>-gzip"; either one means the client is current
+    tags = [tag.strip().removeprefix("W/").replace('-gzip"', '"') for tag in header.split(",")]
+    return etag in tags
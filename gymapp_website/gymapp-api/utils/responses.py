@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+from datetime import date, datetime
+from typing import Any, Callable
+from uuid import UUID
+
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import Headers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+GZIP_MIN_SIZE = int(os.getenv("GZIP_MIN_SIZE", "4096"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+
+def to_dict(obj: Any) -> Any:
+    """Convert table models to plain dicts of their columns and other models via .dict()"""
+    table = getattr(obj, "__table__", None)
+    if table is not None:
+        return {column.key: getattr(obj, column.key) for column in table.columns}
+    if hasattr(obj, "dict"):
+        return obj.dict()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def json_default(obj: Any) -> Any:
+    """JSON fallback for types the encoder does not handle natively"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    return to_dict(obj)
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content as compact JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=to_dict, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=json_default, separators=(",", ":")).encode("utf-8")
+
+
+def gzip_etag(etag: str) -> str:
+    """Tag the gzipped representation's ETag with -gzip so it never equals the identity one"""
+    return etag[:-1] + '-gzip"' if etag.endswith('"') else etag + "-gzip"
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded straight from models/dicts and gzipped above GZIP_MIN_SIZE.
+
+    Returning one of these from a handler skips FastAPI's jsonable_encoder and
+    response_model validation; orjson handles UUID and datetime natively.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+    async def __call__(self, scope, receive, send):
+        if len(self.body) >= GZIP_MIN_SIZE and "content-encoding" not in self.headers:
+            accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+            if "gzip" in accept_encoding:
+                self.body = gzip.compress(self.body, compresslevel=GZIP_LEVEL)
+                self.headers["content-encoding"] = "gzip"
+                self.headers["content-length"] = str(len(self.body))
+                if "etag" in self.headers:
+                    self.headers["etag"] = gzip_etag(self.headers["etag"])
+                self.headers.add_vary_header("Accept-Encoding")
+        await super().__call__(scope, receive, send)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls `on_close` once sending ends, however it ended.
+
+    A generator's finally only runs once the generator has started, so a
+    client that disconnects before the first chunk would otherwise leak
+    whatever the handler acquired for the stream.
+    """
+
+    def __init__(self, content: Any, on_close: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
@@ -0,0 +1,167 @@
+import os
+import re
+from datetime import datetime
+from typing import List, Dict, Any, Tuple
+
+from models.workout_sets import parse_number
+from models.weekly_rollups import week_start
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_CONTEXT_TOKENS", "4000"))
+FULL_DETAIL_WORKOUTS = int(os.getenv("ANALYSIS_FULL_DETAIL_WORKOUTS", "10"))
+WEEKLY_ROLLUP_WEEKS = int(os.getenv("ANALYSIS_WEEKLY_ROLLUP_WEEKS", "8"))
+TOP_SETS_PER_PERIOD = 8
+DETAIL_SEPARATOR = "\n---\n"
+ROLLUP_HEADING = "Earlier training (rolled up):\n"
+
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens in a prompt fragment without a tokenizer.
+
+    Words count one token per four letters, numbers one per three digits and
+    every punctuation mark one, which tracks BPE tokenizers closely enough to
+    budget prompts and errs slightly high.
+    """
+    tokens = 0
+    for piece in _TOKEN_PATTERN.findall(text):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+def workout_date(workout: Dict[str, Any]) -> datetime:
+    """Get a workout's date whether it came from the database or a JSON body"""
+    value = workout['date']
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    return value
+
+
+def format_number(value: float) -> str:
+    """Format a weight or total without a trailing .0"""
+    return f"{value:,.0f}" if value == int(value) else f"{value:,.1f}"
+
+
+def format_workout(workout: Dict[str, Any]) -> str:
+    """Format one workout with every set, for the most recent sessions"""
+    workout_info = f"Date: {workout['date']}\n"
+    workout_info += f"Name: {workout.get('name', 'Unnamed Workout')}\n"
+    workout_info += f"Duration: {workout.get('duration', 'N/A')} minutes\n"
+
+    if 'detailed_exercises' in workout:
+        workout_info += "Exercises:\n"
+        for exercise in workout['detailed_exercises']:
+            workout_info += f"  - {exercise['name']}: "
+            sets_info = []
+            for set_data in exercise.get('sets', []):
+                weight = set_data.get('weight', '0')
+                reps = set_data.get('reps', '0')
+                sets_info.append(f"{weight}lbs x {reps} reps")
+            workout_info += ", ".join(sets_info) + "\n"
+
+    if workout.get('notes'):
+        workout_info += f"Notes: {workout['notes']}\n"
+
+    return workout_info
+
+
+def summarize_period(label: str, workouts: List[Dict[str, Any]]) -> str:
+    """Roll a week or month of workouts up into volume per primary muscle and the top set per exercise"""
+    minutes = sum(workout.get('duration') or 0 for workout in workouts)
+    muscles = {}
+    top_sets = {}
+    for workout in workouts:
+        for exercise in workout.get('detailed_exercises', []):
+            for set_data in exercise.get('sets', []):
+                weight = parse_number(set_data.get('weight'))
+                reps = int(parse_number(set_data.get('reps')))
+                for muscle in exercise.get('muscles') or []:
+                    totals = muscles.setdefault(muscle, [0, 0.0])
+                    totals[0] += 1
+                    totals[1] += weight * reps
+                best = top_sets.get(exercise['name'])
+                if best is None or (weight, reps) > best:
+                    top_sets[exercise['name']] = (weight, reps)
+
+    summary = f"{label}: {len(workouts)} sessions, {minutes} min\n"
+    if muscles:
+        volume = sorted(muscles.items(), key=lambda item: -item[1][1])
+        summary += "  Volume: " + ", ".join(
+            f"{muscle} {sets} sets/{format_number(tonnage)} lbs" for muscle, (sets, tonnage) in volume
+        ) + "\n"
+    if top_sets:
+        heaviest = sorted(top_sets.items(), key=lambda item: item[1], reverse=True)[:TOP_SETS_PER_PERIOD]
+        summary += "  Top sets: " + ", ".join(
+            f"{name} {format_number(weight)}x{reps}" for name, (weight, reps) in heaviest
+        ) + "\n"
+    return summary
+
+
+def group_periods(workouts: List[Dict[str, Any]], weekly_weeks: int) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """Group workouts (newest first) into the latest `weekly_weeks` ISO weeks, then calendar months"""
+    periods = {}
+    weeks = []
+    for workout in workouts:
+        day = workout_date(workout)
+        week = week_start(day)
+        if week not in weeks:
+            weeks.append(week)
+        if len(weeks) <= weekly_weeks:
+            key = f"Week of {week.isoformat()}"
+        else:
+            key = f"Month of {day.strftime('%Y-%m')}"
+        periods.setdefault(key, []).append(workout)
+    return list(periods.items())
+
+
+def build_workout_context(
+    workouts: List[Dict[str, Any]],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    full_detail: int = FULL_DETAIL_WORKOUTS,
+    weekly_weeks: int = WEEKLY_ROLLUP_WEEKS
+) -> str:
+    """Format workout history for a prompt within a token budget.
+
+    The newest `full_detail` workouts are listed set by set. Older workouts
+    are rolled up per ISO week for `weekly_weeks` weeks and per month after
+    that. Blocks are added newest first until the next one would exceed the
+    budget; whatever is left is reported as omitted. Separators, the rollup
+    heading and room for the omitted note count against the budget too.
+    """
+    ordered = sorted(workouts, key=workout_date, reverse=True)
+    used = estimate_tokens(f"({len(ordered)} older sessions omitted)")
+    detail = []
+    for workout in ordered[:full_detail]:
+        block = format_workout(workout)
+        cost = estimate_tokens(block) + (estimate_tokens(DETAIL_SEPARATOR) if detail else 0)
+        if used + cost > token_budget:
+            break
+        detail.append(block)
+        used += cost
+
+    sections = [DETAIL_SEPARATOR.join(detail)] if detail else []
+    remaining = ordered[len(detail):]
+    rollups = []
+    omitted = 0
+    for label, period_workouts in group_periods(remaining, weekly_weeks):
+        if omitted:
+            omitted += len(period_workouts)
+            continue
+        block = summarize_period(label, period_workouts)
+        cost = estimate_tokens(block) + (0 if rollups else estimate_tokens(ROLLUP_HEADING))
+        if used + cost > token_budget:
+            omitted += len(period_workouts)
+            continue
+        rollups.append(block)
+        used += cost
+
+    if rollups:
+        sections.append(ROLLUP_HEADING + "".join(rollups))
+    if omitted:
+        sections.append(f"({omitted} older sessions omitted)")
+    return "\n\n".join(sections)
@@ -21,6 +21,14 @@ class ApiRequests {
         return API.put(`/users/${userId}`, userData);
     }
 
+    static getMuscleActivation(userId, params = {}) {
+        return API.get(`/users/${userId}/muscle-activation`, { params });
+    }
+
+    static getExerciseProgression(userId, exerciseId, points) {
+        return API.get(`/users/${userId}/exercises/${exerciseId}/progression`, { params: { points } });
+    }
+
     static getExercises() {
         return API.get('/exercises');
     }
@@ -29,8 +37,15 @@ class ApiRequests {
         return API.post('/exercises', exerciseData);
     }
 
-    static getWorkouts(userId) {
-        return API.get('/workouts', { params: { item_id: userId } });
+    static getWorkouts(userId, params = {}) {
+        return API.get('/workouts', { params: { item_id: userId, ...params } });
+    }
+
+    static getWorkoutSummaries(userId, params = {}) {
+        return API.get('/workouts/summaries', {
+            params: { user_id: userId, ...params },
+            paramsSerializer: { indexes: null }
+        });
     }
 
     static getWorkout(workoutId) {
@@ -49,8 +64,8 @@ class ApiRequests {
         return API.delete(`/workouts/${workoutId}`);
     }
 
-    static getPlannedWorkouts(userId) {
-        return API.get('/planned-workouts', { params: { user_id: userId } });
+    static getPlannedWorkouts(userId, params = {}) {
+        return API.get('/planned-workouts', { params: { user_id: userId, ...params } });
     }
 
     static getPlannedWorkout(workoutId) {
@@ -69,6 +84,42 @@ class ApiRequests {
         return API.delete(`/planned-workouts/${workoutId}`);
     }
     
+    static async streamAnalysis(body, onText) {
+        const response = await fetch(`${import.meta.env.VITE_API_URL}/analysis/chat/stream`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+            body: JSON.stringify(body)
+        });
+        if (!response.ok) {
+            const { detail } = await response.json().catch(() => ({}));
+            throw new Error(detail || `Analysis stream failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        for (;;) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                const event = (block.match(/^event: (.*)$/m) || [])[1] || 'message';
+                const data = JSON.parse((block.match(/^data: (.*)$/m) || [])[1] || '{}');
+                if (event === 'error') throw new Error(data.error || 'Failed to get response');
+                if (event === 'done') return;
+                onText(data.text);
+            }
+        }
+    }
+
+    static getAnalysisUsage(userId) {
+        return API.get(`/analysis/usage/${userId}`);
+    }
+
     static get(path, config) {
         return API.get(path, config);
     }
@@ -5,6 +5,7 @@ export const useAnalysisStore = defineStore('analysis', {
   state: () => ({
     messages: [],
     dailyMessageCount: 0,
+    dailyLimit: 5,
     lastMessageDate: null,
     hasActiveConversation: false,
     lastSelectedOption: null,
@@ -14,13 +15,11 @@ export const useAnalysisStore = defineStore('analysis', {
 
   getters: {
     remainingMessages: (state) => {
-      const MAX_DAILY_MESSAGES = 5
-      return Math.max(0, MAX_DAILY_MESSAGES - state.dailyMessageCount)
+      return Math.max(0, state.dailyLimit - state.dailyMessageCount)
     },
     
     hasReachedMessageLimit: (state) => {
-      const MAX_DAILY_MESSAGES = 100
-      return state.dailyMessageCount >= MAX_DAILY_MESSAGES
+      return state.dailyMessageCount >= state.dailyLimit
     },
     
     conversationHistory: (state) => {
@@ -56,6 +55,16 @@ export const useAnalysisStore = defineStore('analysis', {
       this.persistState()
     },
     
+    async fetchUsage(userId) {
+      try {
+        const response = await ApiRequests.getAnalysisUsage(userId)
+        this.dailyMessageCount = response.data.daily_messages_used
+        this.dailyLimit = response.data.daily_limit
+      } catch (error) {
+        console.error('Usage fetch error:', error)
+      }
+    },
+    
     persistState() {
       const dataToSave = {
         messages: this.messages,
@@ -88,25 +97,14 @@ export const useAnalysisStore = defineStore('analysis', {
       try {
         console.log('Sending analysis request:', payload.option)
         
-        const response = await ApiRequests.post('/analysis/chat', {
+        await this.streamReply({
           option: payload.option,
-          userData: payload.userData,
-          workouts: payload.workouts,
+          user_id: payload.userId,
           conversationHistory: this.conversationHistory
         })
+        await this.fetchUsage(payload.userId)
         
-        console.log('Analysis response:', response.data)
-        
-        if (response.data.success) {
-          this.addMessage({
-            role: 'assistant',
-            content: response.data.message
-          })
-          
-          return { success: true }
-        } else {
-          throw new Error(response.data.error || 'Failed to get response')
-        }
+        return { success: true }
       } catch (error) {
         this.error = error.message
         console.error('Analysis request error:', error)
@@ -127,23 +125,14 @@ export const useAnalysisStore = defineStore('analysis', {
       this.error = null
       
       try {
-        const response = await ApiRequests.post('/analysis/chat', {
+        await this.streamReply({
           message: payload.message,
-          userData: payload.userData,
-          workouts: payload.workouts,
+          user_id: payload.userId,
           conversationHistory: this.conversationHistory
         })
+        await this.fetchUsage(payload.userId)
         
-        if (response.data.success) {
-          this.addMessage({
-            role: 'assistant',
-            content: response.data.message
-          })
-          
-          return { success: true }
-        } else {
-          throw new Error(response.data.error || 'Failed to get response')
-        }
+        return { success: true }
       } catch (error) {
         this.error = error.message
         console.error('Message send error:', error)
@@ -153,6 +142,24 @@ export const useAnalysisStore = defineStore('analysis', {
       }
     },
     
+    async streamReply(body) {
+      this.addMessage({ role: 'assistant', content: '' })
+      const reply = this.messages[this.messages.length - 1]
+      
+      try {
+        await ApiRequests.streamAnalysis(body, (text) => {
+          reply.content += text
+        })
+      } catch (error) {
+        if (!reply.content) {
+          this.messages.pop()
+        }
+        throw error
+      } finally {
+        this.persistState()
+      }
+    },
+    
     clearConversation() {
       this.messages = []
       this.hasActiveConversation = false
@@ -6,6 +6,8 @@ import ApiRequests from '@/api/request'
 export const usePlannedWorkoutStore = defineStore('plannedWorkout', {
     state: () => ({
         plannedWorkouts: [],
+        syncToken: null,
+        syncedUserId: null,
         currentPlannedWorkout: {
             name: '',
             notes: '',
@@ -49,8 +51,21 @@ export const usePlannedWorkoutStore = defineStore('plannedWorkout', {
             this.error = null
             
             try {
-                const response = await ApiRequests.getPlannedWorkouts(userId)
-                this.plannedWorkouts = response.data.planned_workouts
+                const isDelta = this.syncedUserId === userId && this.syncToken !== null
+                const response = await ApiRequests.getPlannedWorkouts(
+                    userId, isDelta ? { since: this.syncToken } : {}
+                )
+                if (isDelta) {
+                    const removed = new Set(response.data.deleted)
+                    const changed = new Map(response.data.planned_workouts.map(workout => [workout.item_id, workout]))
+                    this.plannedWorkouts = this.plannedWorkouts
+                        .filter(workout => !removed.has(workout.item_id) && !changed.has(workout.item_id))
+                        .concat(response.data.planned_workouts)
+                } else {
+                    this.plannedWorkouts = response.data.planned_workouts
+                }
+                this.syncToken = response.data.sync_token
+                this.syncedUserId = userId
                 
                 return { success: true, data: this.plannedWorkouts }
             } catch (error) {
@@ -6,6 +6,9 @@ import ApiRequests from '@/api/request'
 export const useWorkoutStore = defineStore('workout', {
     state: () => ({
         workouts: [],
+        summaries: {},
+        syncToken: null,
+        syncedUserId: null,
         currentWorkout: {
             name: '',
             date: new Date(),
@@ -62,8 +65,37 @@ export const useWorkoutStore = defineStore('workout', {
             this.loading = true
             this.error = null
             try {
-                const response = await ApiRequests.getWorkouts(userId)
-                this.workouts = response.data.workouts
+                const isDelta = this.syncedUserId === userId && this.syncToken !== null
+                if (isDelta) {
+                    const response = await ApiRequests.getWorkouts(userId, { since: this.syncToken })
+                    const removed = new Set(response.data.deleted)
+                    const changed = new Map(response.data.workouts.map(workout => [workout.item_id, workout]))
+                    this.workouts = this.workouts
+                        .filter(workout => !removed.has(workout.item_id) && !changed.has(workout.item_id))
+                        .concat(response.data.workouts)
+                    this.syncToken = response.data.sync_token
+
+                    const summaries = { ...this.summaries }
+                    removed.forEach(workoutId => delete summaries[workoutId])
+                    if (changed.size > 0) {
+                        const summariesResponse = await ApiRequests.getWorkoutSummaries(userId, { ids: [...changed.keys()] })
+                        summariesResponse.data.summaries.forEach(summary => {
+                            summaries[summary.workout_id] = summary
+                        })
+                    }
+                    this.summaries = summaries
+                } else {
+                    const [response, summariesResponse] = await Promise.all([
+                        ApiRequests.getWorkouts(userId),
+                        ApiRequests.getWorkoutSummaries(userId)
+                    ])
+                    this.workouts = response.data.workouts
+                    this.syncToken = response.data.sync_token
+                    this.summaries = Object.fromEntries(
+                        summariesResponse.data.summaries.map(summary => [summary.workout_id, summary])
+                    )
+                }
+                this.syncedUserId = userId
                 return { success: true, data: this.workouts }
             } catch (error) {
                 this.error = error.message